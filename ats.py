@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+
+# Meridian longitudes in degrees east; ranges are counted west from each one as far as
+# the next meridian, MERIDIAN_SPACING degrees further west
+MERIDIANS = {4: -110.0, 5: -114.0, 6: -118.0}
+MERIDIAN_SPACING = 4.0
+
+# Townships are counted north from the 49th parallel; 126 rows reach the 60th
+BASELINE = 49.0
+TOWNSHIP_DEGREES = 11.0 / 126
+TOWNSHIP_METRES = 9656.06 * 1.0055
+METRES_PER_DEGREE = 111320.0
+
+QUARTERS = {'SE': (0.25, 0.25), 'SW': (0.75, 0.25), 'NE': (0.25, 0.75), 'NW': (0.75, 0.75)}
+
+
+def grid_offsets(number, size):
+    """
+    Offsets of a cell centre within its parent as fractions (west, north), for cells
+    numbered from the south east corner in alternating rows of size, as sections and
+    legal subdivisions are.
+    """
+    index = number - 1
+    row = index // size
+    column = np.where(row % 2 == 0, index % size, size - 1 - index % size)
+    return (column + 0.5) / size, (row + 0.5) / size
+
+
+def split(references):
+    """Split ATS references into numeric meridian, range, township, section and part columns"""
+    parts = pd.Series(references, dtype=object).fillna('').astype(str).str.replace(';', ' ').str.split(expand=True)
+    parts = parts.reindex(columns=range(5))
+    numbers = parts.iloc[:, :4].apply(pd.to_numeric, errors='coerce')
+    return numbers.to_numpy(dtype=float).T, parts[4].fillna('').astype(str).str.upper().to_numpy()
+
+
+def locate(references):
+    """
+    Approximate (lng, lat) centroids for an array of ATS references written as meridian,
+    range, township, section and quarter or legal subdivision, in any mix of space and
+    semicolon separators. References are resolved as finely as they go: a township, a
+    section, then a quarter or legal subdivision. Unresolvable references give NaN, as
+    do ranges that start west of the next meridian at their latitude.
+    """
+    (meridian, rng, township, section), part = split(references)
+
+    longitude = pd.Series(meridian).map(MERIDIANS).to_numpy(dtype=float)
+    valid = ~np.isnan(longitude) & (rng >= 1) & (rng <= 30) & (township >= 1) & (township <= 126)
+
+    west = np.full(len(part), 0.5)
+    north = np.full(len(part), 0.5)
+
+    has_section = valid & (section >= 1) & (section <= 36)
+    section_west, section_north = grid_offsets(np.where(has_section, section, 1).astype(int), 6)
+
+    quarter = pd.Series(part)
+    quarter_west = quarter.map({k: v[0] for k, v in QUARTERS.items()}).fillna(0.5).to_numpy(dtype=float)
+    quarter_north = quarter.map({k: v[1] for k, v in QUARTERS.items()}).fillna(0.5).to_numpy(dtype=float)
+    lsd = pd.to_numeric(pd.Series(part), errors='coerce').to_numpy(dtype=float)
+    has_lsd = has_section & (lsd >= 1) & (lsd <= 16)
+    lsd_west, lsd_north = grid_offsets(np.where(has_lsd, lsd, 1).astype(int), 4)
+    within_west = np.where(has_lsd, lsd_west, quarter_west)
+    within_north = np.where(has_lsd, lsd_north, quarter_north)
+
+    west = np.where(has_section, (section_west - 1 / 12 + within_west / 6), west)
+    north = np.where(has_section, (section_north - 1 / 12 + within_north / 6), north)
+
+    lat = BASELINE + (township - 1 + north) * TOWNSHIP_DEGREES
+    width = TOWNSHIP_METRES / (METRES_PER_DEGREE * np.cos(np.radians(lat)))
+    lng = longitude - (rng - 1 + west) * width
+    valid &= (rng - 1) * width < MERIDIAN_SPACING
+
+    return np.column_stack([np.where(valid, lng, np.nan), np.where(valid, lat, np.nan)])
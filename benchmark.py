@@ -0,0 +1,163 @@
+import os
+import click
+import tracemalloc
+import tempfile
+from time import perf_counter, time
+import boto3
+from botocore.config import Config
+import pandas as pd
+import terra
+import titles
+import bundle
+from simulator import Simulator, S3Simulator, Registry, synthetic_payloads, synthetic_title
+
+
+def measure(function, *args):
+    """Run a function once, returning its result, wall time in seconds and peak traced bytes"""
+    tracemalloc.start()
+    start = perf_counter()
+    result = function(*args)
+    elapsed = perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+@click.group()
+def main():
+    """
+    Offline benchmarks for terra
+    """
+    pass
+
+
+@main.command()
+@click.option('--sizes', default='10000,100000', help='Comma separated title counts')
+def assembly(sizes):
+    """Time and peak memory of building the title DataFrame in Spin.pull"""
+    for count in [int(size) for size in sizes.split(',')]:
+        index, payloads = synthetic_payloads(count)
+        df, elapsed, peak = measure(terra.assemble, index, payloads)
+        click.echo('{:>8} titles  {:8.3f} s  {:8.1f} MB peak  {:8.1f} MB frame'.format(
+            count, elapsed, peak / 1024 ** 2, df.memory_usage(deep=True).sum() / 1024 ** 2))
+
+
+@main.command()
+@click.option('--sizes', default='10000,100000', help='Comma separated title counts')
+@click.option('--workers', default=None, type=int, help='Parser processes for the batch run')
+def parse(sizes, workers):
+    """Throughput of titles.parse in one process and across a process pool"""
+    for count in [int(size) for size in sizes.split(',')]:
+        index, payloads = synthetic_payloads(count)
+        texts = [synthetic_title(payload) for payload in payloads.values()]
+        start = perf_counter()
+        for text in texts:
+            titles.parse(text)
+        elapsed = perf_counter() - start
+        click.echo('{:>8} titles  {:8.3f} s  {:10.0f} titles/s  single process'.format(
+            len(texts), elapsed, len(texts) / elapsed))
+        start = perf_counter()
+        titles.parse_many(texts, workers)
+        elapsed = perf_counter() - start
+        click.echo('{:>8} titles  {:8.3f} s  {:10.0f} titles/s  process pool'.format(
+            len(texts), elapsed, len(texts) / elapsed))
+
+
+
+@main.command()
+@click.option('--sizes', default='500,2000', help='Comma separated title counts')
+@click.option('--workers', default=4, type=int, help='Concurrent requests to the simulator')
+@click.option('--rate', default=200.0, type=float,
+              help='Requests per second across all workers; the budget unless --max-rate is given')
+@click.option('--max-rate', default=None, type=float,
+              help='Budget the request rate may adapt up to, --rate unless given')
+@click.option('--throttle', default=None, type=int, help='Simulated requests per second before 503s')
+@click.option('--latency', default=0.02, type=float, help='Simulated seconds per response')
+@click.option('--error-rate', default=0.0, type=float, help='Fraction of simulated requests that fail')
+@click.option('--limit', default=200, type=int, help='Titles a simulated search table is cut short at')
+@click.option('--density', default=1000, type=int, help='Starting quadrant size in metres')
+@click.option('--adaptive/--no-adaptive', default=True, help='Search with a Quadtree plan')
+def throughput(sizes, workers, rate, max_rate, throttle, latency, error_rate, limit, density, adaptive):
+    """End to end fetch, bundle, pull and parse against the offline Spin simulator"""
+    for count in [int(size) for size in sizes.split(',')]:
+        registry = Registry(count)
+        x_min, y_min, x_max, y_max = registry.bounds
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory, \
+                Simulator(registry, latency=latency, error_rate=error_rate, throttle=throttle, limit=limit) as simulator:
+            os.chdir(directory)
+            os.makedirs('run')
+            try:
+                stages = {}
+                limiter = terra.RateController(rate, ceiling=max_rate)
+                spin = terra.Spin(workers=workers, base_url=simulator.url, limiter=limiter)
+                grid = terra.Geography.grid((y_max, x_max), (y_min, x_min), density)
+                if adaptive:
+                    grid = terra.Quadtree(grid, limit=limit)
+
+                start = perf_counter()
+                spin.fetch(grid)
+                stages['fetch'] = perf_counter() - start
+                start = perf_counter()
+                spin.bundle()
+                stages['bundle'] = perf_counter() - start
+                start = perf_counter()
+                df = spin.pull('1900-01-01')
+                stages['pull'] = perf_counter() - start
+                start = perf_counter()
+                texts = [spin.blobs.get('title', name).decode('utf-8') for name, _ in spin.blobs.names('title')]
+                titles.parse_many(texts, workers=1)
+                stages['parse_title'] = perf_counter() - start
+            finally:
+                os.chdir(cwd)
+
+            retrieved = int(df['linc'].notna().sum())
+            total = sum(stages[stage] for stage in ('fetch', 'bundle', 'pull'))
+            requests = sum(simulator.requests.values())
+            click.echo('{:>8} titles  {:6d} journaled  {:6d} retrieved  {:8.1f} titles/s  {:6.2f} requests/title'.format(
+                count, len(spin.journal), retrieved, retrieved / total, requests / max(retrieved, 1)))
+            for stage, elapsed in stages.items():
+                click.echo('{:>20}  {:8.3f} s'.format(stage, elapsed))
+            click.echo('{:>20}  {}'.format('pacing', limiter.summary()))
+
+
+@main.command('bundle')
+@click.option('--sizes', default='10000,50000', help='Comma separated title counts')
+@click.option('--workers', default=None, type=int, help='Threads compressing members')
+@click.option('--part-size', default=5, type=int, help='Multipart upload part size in MB')
+def bundle_upload(sizes, workers, part_size):
+    """Streaming a bundle of packed titles into a multipart upload to the offline S3 simulator"""
+    for count in [int(size) for size in sizes.split(',')]:
+        index, payloads = synthetic_payloads(count)
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory, S3Simulator() as s3:
+            os.chdir(directory)
+            os.makedirs('data/geojson')
+            try:
+                store = terra.BlobStore()
+                for title, payload in payloads.items():
+                    store.put('title', terra.normalize_title(title), synthetic_title(payload).encode('utf-8'), 'txt',
+                              compress=True)
+                frame = pd.DataFrame({'title_number': list(payloads),
+                                      'linc': [payload['linc'] for payload in payloads.values()]})
+                terra.write_frame(frame, 'data/geojson/synthetic.parquet')
+
+                client = boto3.client('s3', region_name='ca-central-1', endpoint_url=s3.url,
+                                      aws_access_key_id='simulator', aws_secret_access_key='simulator',
+                                      config=Config(s3={'addressing_style': 'path'}))
+                start = perf_counter()
+                sink = bundle.MultipartUpload(client, bundle.BUCKET, 'synthetic.zip', part_size=part_size * 1024 ** 2)
+                record = bundle.bundle(store, ['synthetic.parquet'], sink, time(), workers=workers)
+                sink.close()
+                elapsed = perf_counter() - start
+            finally:
+                os.chdir(cwd)
+
+            size = len(s3.get(bundle.BUCKET, 'synthetic.zip'))
+            click.echo('{:>8} titles  {:8.3f} s  {:8.1f} MB  {:8.1f} MB/s  {:4d} parts  {:6d} members'.format(
+                count, elapsed, size / 1024 ** 2, size / 1024 ** 2 / elapsed, sum(s3.parts.values()),
+                record['written']))
+
+
+if __name__ == '__main__':
+    pass
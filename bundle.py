@@ -1,46 +1,300 @@
 import click
 import os
-from time import time
+import re
 import json
-import zipfile
+import struct
+import zlib
+import hashlib
+from time import time, localtime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import boto3
+from botocore.config import Config
+import pandas as pd
+import metrics
+from terra import normalize_title, site_name, read_frame, write_metrics, BlobStore
+
+BUCKET = 'terra-alberta'
+S3_URL = 'https://s3.ca-central-1.amazonaws.com'
+
+STORED, DEFLATED = 0, 8
+ZIP64_LIMIT = 0xFFFFFFFF
+
+
+class ZipStream:
+    """
+    Writes a zip archive to any stream with a write method, never seeking. Members
+    arrive already compressed with their CRC and sizes known, so each local header is
+    complete up front. Zip64 records are added once the archive outgrows the classic
+    format's entry count or offsets.
+    """
+    def __init__(self, stream, timestamp=None):
+        moment = localtime(timestamp)
+        self.stream = stream
+        self.time = moment.tm_hour << 11 | moment.tm_min << 5 | moment.tm_sec // 2
+        self.date = (moment.tm_year - 1980) << 9 | moment.tm_mon << 5 | moment.tm_mday
+        self.offset = 0
+        self.entries = []
+
+        return None
+
+
+    def write(self, data):
+        self.stream.write(data)
+        self.offset += len(data)
+
+
+    def add(self, name, data, crc, size, method):
+        """Append a member whose data is already compressed with method"""
+        metrics.count('bundle.members')
+        metrics.count('bundle.bytes', len(data))
+        name = name.encode('utf-8')
+        self.entries.append((name, crc, len(data), size, method, self.offset))
+        self.write(struct.pack('<IHHHHHIIIHH', 0x04034b50, 20, 0x800, method, self.time, self.date,
+                               crc, len(data), size, len(name), 0) + name)
+        self.write(data)
+
+
+    def close(self):
+        """Write the central directory and end records"""
+        start = self.offset
+        for name, crc, compressed, size, method, offset in self.entries:
+            extra = b''
+            if offset >= ZIP64_LIMIT:
+                extra, offset = struct.pack('<HHQ', 1, 8, offset), ZIP64_LIMIT
+            self.write(struct.pack('<IHHHHHHIIIHHHHHII', 0x02014b50, 3 << 8 | 45, 45 if extra else 20, 0x800, method,
+                                   self.time, self.date, crc, compressed, size, len(name), len(extra), 0, 0, 0,
+                                   0o100644 << 16, offset) + name + extra)
+        end, count = self.offset, len(self.entries)
+
+        if count >= 0xFFFF or start >= ZIP64_LIMIT or end - start >= ZIP64_LIMIT:
+            self.write(struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 3 << 8 | 45, 45, 0, 0, count, count,
+                                   end - start, start))
+            self.write(struct.pack('<IIQI', 0x07064b50, 0, end, 1))
+        self.write(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+                               min(end - start, ZIP64_LIMIT), min(start, ZIP64_LIMIT), 0))
+
+
+class MultipartUpload:
+    """
+    File-like sink streaming what is written to it into an S3 multipart upload, one
+    part_size part at a time with up to workers parts uploading at once, so an archive
+    never needs a local copy. The upload is aborted if anything fails.
+    """
+    def __init__(self, client, bucket, key, part_size=16 * 1024 ** 2, workers=4, acl='public-read'):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.workers = workers
+        self.buffer = bytearray()
+        self.parts = []
+        self.pending = set()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.upload = client.create_multipart_upload(Bucket=bucket, Key=key, ACL=acl,
+                                                     ContentType='application/zip')['UploadId']
+
+        return None
+
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= self.part_size:
+            self.submit(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+
+
+    def submit(self, body):
+        """Queue a part, first waiting for a slot if workers parts are already in flight"""
+        while len(self.pending) >= self.workers:
+            with metrics.span('bundle.upload_wait'):
+                done, self.pending = wait(self.pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                self.parts.append(future.result())
+        number = len(self.parts) + len(self.pending) + 1
+        self.pending.add(self.executor.submit(self.send, number, body))
+
+
+    def send(self, number, body):
+        with metrics.span('bundle.upload_part', part=number):
+            response = self.client.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload,
+                                               PartNumber=number, Body=body)
+        metrics.count('bundle.parts')
+        metrics.count('bundle.bytes_uploaded', len(body))
+        part = {'PartNumber': number, 'ETag': response['ETag']}
+        for checksum in ('ChecksumCRC32', 'ChecksumCRC32C', 'ChecksumCRC64NVME', 'ChecksumSHA1', 'ChecksumSHA256'):
+            if checksum in response:
+                part[checksum] = response[checksum]
+        return part
+
+
+    def close(self):
+        """Upload the last part and complete the upload"""
+        if self.buffer or not (self.parts or self.pending):
+            self.submit(bytes(self.buffer))
+            self.buffer = bytearray()
+        self.parts.extend(future.result() for future in self.pending)
+        self.pending = set()
+        self.executor.shutdown(wait=True)
+        self.client.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload,
+                                              MultipartUpload={'Parts': sorted(self.parts, key=lambda p: p['PartNumber'])})
+
+
+    def abort(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload)
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@metrics.timed('bundle.compress')
+def compress(name, load, method, level):
+    """Load a member and deflate it if asked, returning what ZipStream.add takes"""
+    data = load()
+    crc = zlib.crc32(data)
+    if method == DEFLATED:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        return name, compressor.compress(data) + compressor.flush(), crc, len(data), method
+    return name, data, crc, len(data), method
+
+
+def members(store, localities):
+    """
+    Every (name, digest, load, method) to bundle for some localities: each title and
+    site plan once, however many localities share it, then the locality files.
+    Titles are deflated; site plans are already compressed images and are stored.
+    """
+    seen = set()
+    for locality in localities:
+        path = 'data/geojson/{}'.format(locality)
+        frame = read_frame(path, columns=['title_number', 'linc'])
+        frame = frame.dropna(subset=['title_number'])
+
+        for title, site in zip(frame['title_number'], frame['linc']):
+            name = 'data/titles/{}.txt'.format(normalize_title(title))
+            entry = store.entry('title', normalize_title(title))
+            if entry and name not in seen:
+                seen.add(name)
+                yield name, entry[0], (lambda digest=entry[0]: store.read(digest)), DEFLATED
+
+            entry = store.entry('site', site_name(site)) if not pd.isna(site) else None
+            if entry:
+                name = 'data/sites/{}.{}'.format(site_name(site), entry[1])
+                if name not in seen:
+                    seen.add(name)
+                    yield name, entry[0], (lambda digest=entry[0]: store.read(digest)), STORED
+
+        yield path, hashlib.sha256(read_file(path)).hexdigest(), (lambda path=path: read_file(path)), DEFLATED
+
+
+def manifest(since):
+    """A previous bundle's manifest by timestamp, the newest for 'last', or None"""
+    if since is None:
+        return None
+    if since == 'last':
+        # Only <timestamp>.json are manifests; profiled runs leave .metrics.json and .trace.json beside them
+        stamps = [name[:-len('.json')] for name in os.listdir('data/bundles')
+                  if name.endswith('.json') and re.fullmatch(r'[0-9]+(\.[0-9]+)?', name[:-len('.json')])]
+        if not stamps:
+            return None
+        since = max(stamps, key=float)
+    path = 'data/bundles/{}.json'.format(since)
+    if not os.path.exists(path):
+        raise click.BadParameter('No manifest for bundle {}'.format(since), param_hint='--since')
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def bundle(store, localities, stream, timestamp, previous=None, workers=None, level=6):
+    """
+    Compresses the members of some localities across a thread pool and writes them in
+    order to a zip stream, keeping a bounded window of members in flight. Members whose
+    digest matches the previous bundle's manifest are left out, making a delta of it.
+    Returns the manifest of everything the bundle stands for, which is also archived.
+    """
+    workers = workers or os.cpu_count()
+    unchanged = previous['members'] if previous else {}
+    archive = ZipStream(stream, timestamp)
+    digests, window = {}, deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for name, digest, load, method in members(store, localities):
+            digests[name] = digest
+            if unchanged.get(name) == digest:
+                metrics.count('bundle.unchanged')
+                continue
+            window.append(executor.submit(compress, name, load, method, level))
+            if len(window) >= workers * 4:
+                with metrics.span('bundle.compress_wait'):
+                    member = window.popleft().result()
+                archive.add(*member)
+        while window:
+            archive.add(*window.popleft().result())
+
+    record = dict(timestamp=timestamp, localities=list(localities), members=digests,
+                  since=previous['timestamp'] if previous else None,
+                  removed=sorted(set(unchanged) - set(digests)),
+                  written=len(archive.entries))
+    archive.add(*compress('manifest.json', lambda: json.dumps(record, indent=1).encode('utf-8'), DEFLATED, level))
+    archive.close()
+    return record
+
 
 @click.command()
 @click.argument('geojson_list', nargs=-1)
 @click.option('--s3/--no-s3', help='Upload to Amazon S3', default=True)
-def main(geojson_list, s3):
+@click.option('--blobs', default='data/blobs', help='Blob store holding title texts and site plans')
+@click.option('--since', default=None, help="Only what changed since an earlier bundle's timestamp, or 'last'")
+@click.option('--workers', default=None, type=int, help='Threads compressing members')
+@click.option('--level', default=6, type=int, help='Deflate level for titles')
+@click.option('--bucket', default=BUCKET, help='S3 bucket to upload to')
+@click.option('--endpoint-url', default=None, help='S3 endpoint, for a local stand-in')
+@click.option('--part-size', default=16, type=int, help='Multipart upload part size in MB')
+@click.option('--profile', is_flag=True, default=False, help='Record a Chrome trace timeline of the bundle')
+@click.option('--metrics-out', default=None, help='Path for the JSON summary of timings and counters')
+def main(geojson_list, s3, blobs, since, workers, level, bucket, endpoint_url, part_size, profile, metrics_out):
+    """
+    Bundle the titles and site plans of some saved localities into one zip, streamed
+    straight to S3 or written to data/bundles
+    """
     timestamp = time()
+    if profile or metrics_out:
+        metrics.enable(trace=profile)
+        click.get_current_context().call_on_close(
+            lambda: write_metrics(timestamp, metrics_out or 'data/bundles/{}.metrics.json'.format(timestamp)))
+    store = BlobStore(blobs)
+    previous = manifest(since)
+    stems = '_'.join(os.path.splitext(locality)[0] for locality in geojson_list)
+    key = '{}-{}.zip'.format(stems, timestamp)
 
-    with zipfile.ZipFile('data/bundles/{}.zip'.format(timestamp), "w") as zip:
+    if s3:
+        config = Config(s3={'addressing_style': 'path'}) if endpoint_url else None
+        client = boto3.client('s3', region_name='ca-central-1', endpoint_url=endpoint_url, config=config)
+        sink = MultipartUpload(client, bucket, key, part_size=part_size * 1024 ** 2)
+        click.echo('Bundling to {}'.format(key))
+    else:
+        sink = open('data/bundles/{}.zip'.format(timestamp), "wb")
         click.echo('Bundling to {}.zip'.format(timestamp))
 
-        for locality in geojson_list:
-            with open('data/geojson/{}'.format(locality), "r") as geojson_file:
-                j = json.load(geojson_file)
-                titles = [(f['properties']['title_number'], f['properties']['linc'])
-                                                            for f in j['features']]
-
-                for title, site in titles:
-                    try:
-                        a, b = title.split('+')
-                        b = str(b).zfill(3)
-                        title = "".join([a, b])
-                    except:
-                        pass
-                    title_file = title.replace(" ", "") + '.txt'
-                    site_file = str(site).zfill(10) + '.png'
+    try:
+        record = bundle(store, geojson_list, sink, timestamp, previous, workers, level)
+        sink.close()
+    except BaseException:
+        if s3:
+            sink.abort()
+        else:
+            sink.close()
+        raise
 
-                    zip.write('data/titles/{}'.format(title_file))
-                    zip.write('data/sites/{}'.format(site_file))
-
-                zip.write('data/geojson/{}'.format(locality))
+    with open('data/bundles/{}.json'.format(timestamp), "w") as f:
+        json.dump(record, f)
+    click.echo('{} of {} members bundled{}'.format(record['written'], len(record['members']),
+                                                   ' since {}'.format(record['since']) if previous else ''))
 
     if s3:
-        s3 = boto3.resource('s3')
-        s3.meta.client.upload_file('data/bundles/{}.zip'.format(timestamp), 'terra-alberta', '{}-{}.zip'.format(locality.replace('.geojson', ''), timestamp), ExtraArgs={'ACL':'public-read'})
-
-        link = 'https://s3.ca-central-1.amazonaws.com/terra-alberta/' + '{}-{}.zip'.format(locality.replace('.geojson', ''), timestamp)
-        click.echo(link)
+        click.echo('{}/{}/{}'.format(endpoint_url or S3_URL, bucket, key))
 
 
 if __name__ == '__main__':
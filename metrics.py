@@ -0,0 +1,235 @@
+import os
+import json
+from time import perf_counter, time
+from threading import Lock, current_thread, get_ident
+from collections import Counter
+from contextlib import nullcontext
+from functools import wraps
+
+
+# Latency bucket upper bounds in seconds, doubling from a tenth of a millisecond
+BOUNDS = [0.0001 * 2 ** i for i in range(22)]
+
+
+class Histogram:
+    """Latency histogram over doubling buckets, with count, total, extremes and quantiles"""
+    def __init__(self):
+        self.buckets = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.low = None
+        self.high = None
+
+        return None
+
+
+    def add(self, seconds):
+        index = 0
+        while index < len(BOUNDS) and seconds > BOUNDS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.low = seconds if self.low is None else min(self.low, seconds)
+        self.high = seconds if self.high is None else max(self.high, seconds)
+
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the qth quantile, capped at the largest value seen"""
+        seen = 0
+        for bound, count in zip(BOUNDS + [self.high], self.buckets):
+            seen += count
+            if seen >= q * self.count:
+                return min(bound, self.high)
+        return self.high
+
+
+    def summary(self):
+        return dict(count=self.count, total=self.total, mean=self.total / self.count, min=self.low, max=self.high,
+                    p50=self.quantile(0.5), p90=self.quantile(0.9), p99=self.quantile(0.99))
+
+
+class Span:
+    def __init__(self, metrics, name, args):
+        self.metrics = metrics
+        self.name = name
+        self.args = args
+
+        return None
+
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, perf_counter() - self.start, self.start, self.args)
+        return False
+
+
+class Metrics:
+    """
+    Timers, counters, gauges and latency histograms for a run. Disabled, every call is
+    close to free, so instrumentation stays in place. Enabled with trace, each timed span
+    is also kept as a complete event for a Chrome trace timeline, up to max_events.
+    Counters named 'X.hit' and 'X.miss' are reported as X's hit rate. Gauges keep their
+    last value along with the lowest and highest seen.
+    """
+    def __init__(self, max_events=2000000):
+        self.max_events = max_events
+        self.enabled = False
+        self.tracing = False
+        self.lock = Lock()
+        self.reset()
+
+        return None
+
+
+    def reset(self):
+        with self.lock:
+            self.counters = Counter()
+            self.gauges = {}
+            self.histograms = {}
+            self.events = []
+            self.threads = {}
+            self.dropped = 0
+            self.origin = perf_counter()
+            self.started = time()
+
+
+    def enable(self, trace=False):
+        self.reset()
+        self.enabled = True
+        self.tracing = trace
+
+
+    def span(self, name, **args):
+        """Context manager timing a block into the histogram of name"""
+        if not self.enabled:
+            return nullcontext()
+        return Span(self, name, args)
+
+
+    def timed(self, name):
+        """Decorator timing every call of a function as a span"""
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with Span(self, name, None):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+    def observe(self, name, seconds, start=None, args=None):
+        """Record a duration, and a trace event if it has a start"""
+        if not self.enabled:
+            return
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].add(seconds)
+            if self.tracing and start is not None:
+                if len(self.events) >= self.max_events:
+                    self.dropped += 1
+                    return
+                thread = get_ident()
+                if thread not in self.threads:
+                    self.threads[thread] = current_thread().name
+                event = dict(name=name, cat=name.split('.')[0], ph='X', ts=(start - self.origin) * 1e6,
+                             dur=seconds * 1e6, pid=os.getpid(), tid=thread)
+                if args:
+                    event['args'] = {key: str(value) for key, value in args.items()}
+                self.events.append(event)
+
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] += value
+
+
+    def gauge(self, name, value):
+        """Set the current value of name"""
+        if not self.enabled:
+            return
+        with self.lock:
+            if name in self.gauges:
+                gauge = self.gauges[name]
+                gauge.update(value=value, min=min(gauge['min'], value), max=max(gauge['max'], value))
+            else:
+                self.gauges[name] = dict(value=value, min=value, max=value)
+
+
+    def summary(self):
+        """Counters, gauges, hit rates and per span latency statistics as a JSON-ready dict"""
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = {name: dict(gauge) for name, gauge in sorted(self.gauges.items())}
+            histograms = {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+        rates = {}
+        for name in counters:
+            if name.endswith('.hit'):
+                stem = name[:-len('.hit')]
+                total = counters[name] + counters.get(stem + '.miss', 0)
+                rates[stem] = counters[name] / total if total else 0.0
+        return dict(started=self.started, elapsed=perf_counter() - self.origin, counters=counters,
+                    gauges=gauges, hit_rates=rates, spans=histograms, dropped_events=self.dropped)
+
+
+    def report(self, top=15):
+        """Console lines for the spans taking the most time, then counters and hit rates"""
+        summary = self.summary()
+        lines = ['{:<40} {:>8} {:>10} {:>9} {:>9} {:>9}'.format('span', 'count', 'total s', 'p50 ms', 'p90 ms',
+                                                                 'p99 ms')]
+        spans = sorted(summary['spans'].items(), key=lambda item: -item[1]['total'])[:top]
+        for name, span in spans:
+            lines.append('{:<40} {:>8} {:>10.3f} {:>9.1f} {:>9.1f} {:>9.1f}'.format(
+                name, span['count'], span['total'], span['p50'] * 1000, span['p90'] * 1000, span['p99'] * 1000))
+        for name, value in sorted(summary['counters'].items()):
+            lines.append('{:<40} {:>8}'.format(name, value))
+        for name, gauge in summary['gauges'].items():
+            lines.append('{:<40} {:>8.2f} (ranged {:.2f} to {:.2f})'.format(name, gauge['value'], gauge['min'],
+                                                                           gauge['max']))
+        for name, rate in sorted(summary['hit_rates'].items()):
+            lines.append('{:<40} {:>8.0%} hit rate'.format(name, rate))
+        return '\n'.join(lines)
+
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=1)
+
+
+    def write_trace(self, path):
+        """Write the timeline in Chrome's trace event format, for chrome://tracing or Perfetto"""
+        with self.lock:
+            names = [dict(name='thread_name', ph='M', pid=os.getpid(), tid=thread, args=dict(name=name))
+                     for thread, name in self.threads.items()]
+            events = names + list(self.events)
+        with open(path, "w") as f:
+            json.dump(dict(traceEvents=events, displayTimeUnit='ms'), f)
+
+
+    def dump(self, path, trace=None):
+        """Write the JSON summary, and the trace too when one is being recorded and trace names a path"""
+        self.write(path)
+        if self.tracing and trace:
+            self.write_trace(trace)
+
+
+# Shared by every module of a run
+METRICS = Metrics()
+
+enable = METRICS.enable
+span = METRICS.span
+timed = METRICS.timed
+observe = METRICS.observe
+count = METRICS.count
+gauge = METRICS.gauge
+report = METRICS.report
+dump = METRICS.dump
@@ -15,7 +15,7 @@ setup(
     url='https://github.com/jamwil/terra',
     author='James Williams',
     author_email='jamwil@gmail.com',
-    py_modules=["terra","bundle"],
+    py_modules=["terra","bundle","benchmark","titles","simulator","ats","metrics"],
     install_requires=[
         'click',
         'numpy',
@@ -24,15 +24,24 @@ setup(
         'bs4',
         'pandas',
         'geopandas',
+        'pyproj',
         'lxml',
         'selenium',
         'pillow',
         'html5lib',
+        'pyarrow',
         'boto3'
     ],
     entry_points="""
         [console_scripts]
         terra=terra:terra
+        terra-parcels=terra:parcels
+        terra-gazetteer=terra:gazetteer
+        terra-query=terra:query
+        terra-blobs=terra:blobs
         bundle=bundle:main
+        terra-benchmark=benchmark:main
+        terra-titles=titles:main
+        terra-simulator=simulator:main
     """
 )
@@ -0,0 +1,521 @@
+import re
+from random import Random
+from time import sleep, monotonic
+from threading import Thread, Lock
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http.cookies import SimpleCookie
+from urllib.parse import urlparse, parse_qs, unquote
+from hashlib import md5
+from secrets import token_hex
+import click
+import shapely
+from shapely.geometry import Point, Polygon
+
+
+def synthetic_payloads(count, seed=0):
+    """
+    Returns a journal-style index and parsed title payloads keyed by title number,
+    with roughly one title in fifty left unretrieved.
+    """
+    rng = Random(seed)
+    index, payloads = [], {}
+    for i in range(count):
+        title = '{:03d} {:03d} {:03d}'.format(i // 1000000, (i // 1000) % 1000, i % 1000)
+        index.append(title)
+        if rng.random() < 0.02:
+            continue
+        payloads[title] = {
+            'linc': rng.randrange(10 ** 9, 10 ** 10),
+            'short_legal': '{};{};{}'.format(rng.randrange(9999), rng.randrange(99), rng.randrange(99)),
+            'title_number': title,
+            'ats_reference': '4 {} {} {} {}'.format(rng.randrange(1, 31), rng.randrange(1, 127), rng.randrange(1, 37),
+                                                  rng.choice(['NE', 'NW', 'SE', 'SW'])),
+            'municipality': rng.choice(['CITY OF EDMONTON', 'CITY OF CALGARY', 'TOWN OF OKOTOKS']),
+            'registration': '{:03d} {:03d} {:03d}'.format(rng.randrange(999), rng.randrange(999), rng.randrange(999)),
+            'date': '20{:02d}-{:02d}-{:02d}'.format(rng.randrange(10, 20), rng.randrange(1, 13), rng.randrange(1, 29)),
+            'document_type': rng.choice(['TRANSFER OF LAND', 'MORTGAGE', 'SUBDIVISION PLAN']),
+            'value': rng.choice([None, rng.randrange(100000, 2000000)]),
+            'consideration': rng.choice([None, rng.randrange(100000, 2000000)]),
+            'condo': rng.random() < 0.3
+        }
+    return index, payloads
+
+
+def synthetic_title(payload):
+    """Renders a parsed payload back into Spin's fixed-width title text layout"""
+    rule = '-' * 100
+
+    def money(value):
+        return '' if value is None else '${:,}'.format(value)
+
+    day = '/'.join(reversed(payload['date'].split('-')))
+    lines = [
+        '{:^100}'.format('LAND TITLE CERTIFICATE'),
+        '',
+        'S',
+        '{:<17}{:<46}{}'.format('LINC', 'SHORT LEGAL', 'TITLE NUMBER'),
+        '{:<17}{:<46}{}'.format('{:04d} {:03d} {:03d}'.format(
+            payload['linc'] // 10 ** 6, (payload['linc'] // 1000) % 1000, payload['linc'] % 1000),
+            payload['short_legal'], payload['title_number']),
+        '',
+        'LEGAL DESCRIPTION',
+        'CONDOMINIUM PLAN 0512345' if payload['condo'] else 'PLAN 0512345',
+        'BLOCK 5',
+        'LOT 6',
+        'EXCEPTING THEREOUT ALL MINES AND MINERALS',
+        '',
+        'ESTATE: FEE SIMPLE',
+        'ATS REFERENCE: {}'.format(payload['ats_reference'].replace(' ', ';')),
+        '',
+        'MUNICIPALITY: {}'.format(payload['municipality']),
+        '',
+        'REFERENCE NUMBER: 012 345 678',
+        '',
+        rule,
+        '{:^100}'.format('REGISTERED OWNER(S)'),
+        'REGISTRATION    DATE(DMY)  DOCUMENT TYPE      VALUE           CONSIDERATION',
+        rule,
+        '',
+        '{:<15}{:<12}{:<19}{:<16}{}'.format(payload['registration'], day, payload['document_type'][:18],
+                                            money(payload['value']), money(payload['consideration'])),
+        '',
+        'OWNERS',
+        '',
+        'JANE DOE',
+        'OF 123 MAIN STREET',
+        '',
+        '{:^100}'.format('( DATA UPDATED BY:  TRANSFER OF LAND )')
+    ]
+    return '<pre>' + '\n'.join(lines) + '</pre>'
+
+
+class Registry:
+    """
+    Synthetic land titles dataset: one parcel per title scattered over a bounding box in
+    Alberta 10-TM coordinates, with journal rows and title texts for each.
+    """
+    def __init__(self, count=1000, bounds=(0, 5900000, 4000, 5904000), seed=0):
+        rng = Random(seed)
+        index, self.payloads = synthetic_payloads(count, seed)
+        x_min, y_min, x_max, y_max = bounds
+        self.bounds = bounds
+        self.rows = []
+        points = []
+        for title in index:
+            payload = self.payloads.get(title)
+            date = payload['date'] if payload else '2015-01-01'
+            self.rows.append((
+                title,
+                'Current Title' if rng.random() > 0.05 else 'Historical Title',
+                'Surface' if rng.random() > 0.05 else 'Mineral',
+                '/'.join(reversed(date.split('-')))
+            ))
+            points.append(Point(rng.uniform(x_min, x_max), rng.uniform(y_min, y_max)))
+        self.points = points
+        self.tree = shapely.STRtree(points)
+
+        return None
+
+
+    def search(self, pts):
+        """Journal rows for parcels inside a 'x;y;x;y;...' polygon string"""
+        values = [float(v) for v in pts.split(';') if v.strip()]
+        polygon = Polygon(list(zip(values[0::2], values[1::2])))
+        return [self.rows[i] for i in sorted(self.tree.query(polygon, predicate='intersects'))]
+
+
+    def title(self, title):
+        """Title text for a title number, or None if it has no current title"""
+        payload = self.payloads.get(title)
+        return synthetic_title(payload) if payload else None
+
+
+LOGIN_PAGE = '''<html><body><form>
+<input type="hidden" id="__EVENTTARGET" value="" />
+<input type="hidden" id="__EVENTARGUMENT" value="" />
+<input type="hidden" id="__VIEWSTATE" value="{}" />
+<input type="text" name="uctrlLogon:txtLogonName" id="uctrlLogon_txtLogonName" />
+<input type="image" name="uctrlLogon:cmdLogonGuest" id="uctrlLogon_cmdLogonGuest" />
+</form></body></html>'''
+
+GUEST_PAGE = '<html><body><span>You are logged on as a Guest.</span></body></html>'
+
+TABLE_ROW = '<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td></td></tr>'
+
+# Search results; a quadrant with no titles gets the table with only its header row
+TABLE_PAGE = '''<html><body><table class="bodyText">
+<tr><th>Title Number</th><th>Type</th><th>Rights</th><th>Registration Date</th><th>Change/Cancel Date</th></tr>
+{}
+</table></body></html>'''
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Routes the Spin pages terra uses onto the simulator's registry"""
+    def log_message(self, format, *args):
+        pass
+
+
+    def do_GET(self):
+        self.route()
+
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        self.route()
+
+
+    def route(self):
+        simulator = self.server.simulator
+        url = urlparse(self.path)
+        page = url.path.rstrip('/').split('/')[-1].lower()
+        query = parse_qs(url.query)
+
+        delay, status = simulator.admit(page)
+        if delay:
+            sleep(delay)
+        if status != 200:
+            return self.reply(status, '')
+
+        if page in ('spinii', 'logon.aspx'):
+            return self.reply(200, LOGIN_PAGE.format(token_hex(16)))
+        if page == 'legalnotice.aspx':
+            session = simulator.login()
+            return self.reply(200, GUEST_PAGE, {'Set-Cookie': 'ASP.NET_SessionId={}; path=/'.format(session)})
+
+        cookies = SimpleCookie(self.headers.get('Cookie', ''))
+        session = cookies['ASP.NET_SessionId'].value if 'ASP.NET_SessionId' in cookies else None
+        if not simulator.valid(session):
+            return self.reply(200, LOGIN_PAGE.format(token_hex(16)))
+
+        if page == 'searchtitleprint.aspx':
+            rows = simulator.registry.search(query.get('pts', [''])[0])[:simulator.limit]
+            return self.reply(200, TABLE_PAGE.format('\n'.join(TABLE_ROW.format(*row) for row in rows)))
+        if page == 'immediatecheckoutpreviewhtml.aspx':
+            text = simulator.registry.title(query.get('ArticleID', [''])[0])
+            return self.reply(200, '<html><body>{}</body></html>'.format(text or 'Title not found'))
+
+        self.reply(404, 'Not found')
+
+
+    def reply(self, status, body, headers=None):
+        content = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(content)
+        self.server.simulator.sent(len(content))
+
+
+class Simulator:
+    """
+    Local stand-in for Spin serving a synthetic Registry. Latency, random server errors,
+    throttling above a request rate, guest session lifetime and the number of titles a
+    search table is cut short at are all configurable. Counts requests per page.
+    """
+    def __init__(self, registry=None, latency=0.0, error_rate=0.0, throttle=None, limit=1000,
+                 session_ttl=None, port=0, seed=0):
+        self.registry = registry if registry is not None else Registry()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle = throttle
+        self.limit = limit
+        self.session_ttl = session_ttl
+        self.rng = Random(seed)
+        self.lock = Lock()
+        self.sessions = {}
+        self.requests = Counter()
+        self.errors = Counter()
+        self.bytes = 0
+        self.window = deque()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self.server.simulator = self
+        self.thread = None
+
+        return None
+
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}/SpinII'.format(self.server.server_address[1])
+
+
+    def admit(self, page):
+        """Count a request and decide its latency and whether it is throttled or fails"""
+        with self.lock:
+            now = monotonic()
+            self.requests[page] += 1
+            status = 200
+            if self.throttle:
+                while self.window and now - self.window[0] > 1:
+                    self.window.popleft()
+                if len(self.window) >= self.throttle:
+                    status = 503
+                else:
+                    self.window.append(now)
+            if status == 200 and self.rng.random() < self.error_rate:
+                status = 500
+            if status != 200:
+                self.errors[page] += 1
+        return self.latency, status
+
+
+    def login(self):
+        session = token_hex(12)
+        with self.lock:
+            self.sessions[session] = monotonic()
+        return session
+
+
+    def valid(self, session):
+        with self.lock:
+            started = self.sessions.get(session)
+        if started is None:
+            return False
+        return self.session_ttl is None or monotonic() - started < self.session_ttl
+
+
+    def expire(self):
+        """Drop every guest session, as Spin does when they time out"""
+        with self.lock:
+            self.sessions.clear()
+
+
+    def sent(self, size):
+        with self.lock:
+            self.bytes += size
+
+
+    def start(self):
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+    def __enter__(self):
+        return self.start()
+
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+class S3Handler(BaseHTTPRequestHandler):
+    """Path style object and multipart upload requests against the S3 simulator's buckets"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+
+    def do_PUT(self):
+        s3, (bucket, key), query = self.server.simulator, self.target(), self.query()
+        body = self.body()
+        if 'uploadId' in query:
+            if not s3.admit():
+                return self.reply(500, ERROR.format('InternalError'))
+            etag = s3.upload_part(query['uploadId'][0], int(query['partNumber'][0]), body)
+            if etag is None:
+                return self.reply(404, ERROR.format('NoSuchUpload'))
+            return self.reply(200, '', {'ETag': etag})
+        self.reply(200, '', {'ETag': s3.put(bucket, key, body)})
+
+
+    def do_POST(self):
+        s3, (bucket, key), query = self.server.simulator, self.target(), self.query()
+        body = self.body()
+        if 'uploads' in query:
+            return self.reply(200, INITIATED.format(bucket, key, s3.create(bucket, key)))
+        if 'uploadId' in query:
+            numbers = [int(number) for number in re.findall(r'<PartNumber>(\d+)</PartNumber>', body.decode('utf-8'))]
+            error = s3.complete(query['uploadId'][0], numbers)
+            if error:
+                return self.reply(400, ERROR.format(error))
+            return self.reply(200, COMPLETED.format(bucket, key))
+        self.reply(400, ERROR.format('InvalidRequest'))
+
+
+    def do_DELETE(self):
+        s3, (bucket, key), query = self.server.simulator, self.target(), self.query()
+        if 'uploadId' in query:
+            s3.abort(query['uploadId'][0])
+        else:
+            s3.delete(bucket, key)
+        self.reply(204, '')
+
+
+    def do_GET(self):
+        content = self.server.simulator.get(*self.target())
+        if content is None:
+            return self.reply(404, ERROR.format('NoSuchKey'))
+        self.reply(200, content)
+
+
+    def target(self):
+        bucket, _, key = unquote(urlparse(self.path).path).lstrip('/').partition('/')
+        return bucket, key
+
+
+    def query(self):
+        return parse_qs(urlparse(self.path).query, keep_blank_values=True)
+
+
+    def body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+
+    def reply(self, status, body, headers=None):
+        content = body if isinstance(body, bytes) else body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/xml')
+        if status != 204:
+            self.send_header('Content-Length', str(len(content)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if status != 204:
+            self.wfile.write(content)
+
+
+ERROR = '<?xml version="1.0" encoding="UTF-8"?><Error><Code>{}</Code><Message></Message></Error>'
+INITIATED = ('<?xml version="1.0" encoding="UTF-8"?><InitiateMultipartUploadResult><Bucket>{}</Bucket>'
+             '<Key>{}</Key><UploadId>{}</UploadId></InitiateMultipartUploadResult>')
+COMPLETED = ('<?xml version="1.0" encoding="UTF-8"?><CompleteMultipartUploadResult><Bucket>{}</Bucket>'
+             '<Key>{}</Key><ETag>"complete"</ETag></CompleteMultipartUploadResult>')
+
+
+class S3Simulator:
+    """
+    Local in-memory stand-in for S3, enough for bundle uploads: objects, and multipart
+    uploads that refuse parts under min_part_size other than the last, as S3 does. A
+    fraction of part uploads can be made to fail. Clients must use path style addressing.
+    """
+    def __init__(self, min_part_size=5 * 1024 ** 2, error_rate=0.0, port=0, seed=0):
+        self.min_part_size = min_part_size
+        self.error_rate = error_rate
+        self.rng = Random(seed)
+        self.lock = Lock()
+        self.objects = {}
+        self.uploads = {}
+        self.parts = Counter()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), S3Handler)
+        self.server.daemon_threads = True
+        self.server.simulator = self
+        self.thread = None
+
+        return None
+
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+
+
+    def admit(self):
+        with self.lock:
+            return self.rng.random() >= self.error_rate
+
+
+    def put(self, bucket, key, content):
+        with self.lock:
+            self.objects[(bucket, key)] = content
+        return '"{}"'.format(md5(content).hexdigest())
+
+
+    def get(self, bucket, key):
+        with self.lock:
+            return self.objects.get((bucket, key))
+
+
+    def delete(self, bucket, key):
+        with self.lock:
+            self.objects.pop((bucket, key), None)
+
+
+    def create(self, bucket, key):
+        upload = token_hex(12)
+        with self.lock:
+            self.uploads[upload] = (bucket, key, {})
+        return upload
+
+
+    def upload_part(self, upload, number, content):
+        with self.lock:
+            if upload not in self.uploads:
+                return None
+            self.uploads[upload][2][number] = content
+            self.parts[upload] += 1
+        return '"{}"'.format(md5(content).hexdigest())
+
+
+    def complete(self, upload, numbers):
+        """Assemble an upload from the listed parts, returning an S3 error code on failure"""
+        with self.lock:
+            if upload not in self.uploads:
+                return 'NoSuchUpload'
+            bucket, key, parts = self.uploads[upload]
+            if not numbers or any(number not in parts for number in numbers):
+                return 'InvalidPart'
+            if any(len(parts[number]) < self.min_part_size for number in numbers[:-1]):
+                return 'EntityTooSmall'
+            self.objects[(bucket, key)] = b''.join(parts[number] for number in numbers)
+            del self.uploads[upload]
+        return None
+
+
+    def abort(self, upload):
+        with self.lock:
+            self.uploads.pop(upload, None)
+
+
+    def start(self):
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+    def __enter__(self):
+        return self.start()
+
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+@click.command()
+@click.option('--titles', default=1000, type=int, help='Synthetic titles to serve')
+@click.option('--port', default=8080, type=int, help='Port to listen on')
+@click.option('--latency', default=0.0, type=float, help='Seconds added to every response')
+@click.option('--error-rate', default=0.0, type=float, help='Fraction of requests that fail')
+@click.option('--throttle', default=None, type=int, help='Requests per second before 503s')
+@click.option('--limit', default=1000, type=int, help='Titles a search table is cut short at')
+def main(titles, port, latency, error_rate, throttle, limit):
+    """
+    Serve a synthetic Spin for offline runs and benchmarks
+    """
+    simulator = Simulator(Registry(titles), latency=latency, error_rate=error_rate,
+                          throttle=throttle, limit=limit, port=port)
+    click.echo('Serving {} titles at {} over {}'.format(titles, simulator.url, simulator.registry.bounds))
+    try:
+        simulator.server.serve_forever()
+    except KeyboardInterrupt:
+        simulator.stop()
+
+
+if __name__ == '__main__':
+    pass
@@ -1,12 +1,21 @@
 import os
 import json
 import re
-from random import choice
-from time import sleep, time
+from random import choice, random
+from time import sleep, time, monotonic
+from threading import Lock, Thread
+from queue import Queue
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
-from collections import namedtuple
+from collections import namedtuple, deque
+from difflib import get_close_matches
 import pickle
+import hashlib
+import zlib
+import sqlite3
+from io import StringIO, BytesIO
 import click
+import numpy as np
 import pandas as pd
 import requests
 from bs4 import BeautifulSoup
@@ -20,30 +29,334 @@ from selenium.webdriver import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from shapely.geometry import Point
+from selenium.common.exceptions import WebDriverException
+import shapely
+from shapely import wkt
+from shapely.geometry import Point, Polygon, shape
+from shapely.geometry.base import BaseGeometry
+from shapely.ops import transform, unary_union
+from pyproj import Transformer
+import titles
+import ats
+import metrics
+
+
+class Projection:
+    """
+    In-process, vectorized transform between GPS (EPSG:4326) and Alberta 10-TM
+    (EPSG:3401) coordinates. Accepts scalars or NumPy arrays of any shape.
+    """
+    def __init__(self, source=4326, target=3401):
+        self.source, self.target = source, target
+        self._forward = Transformer.from_crs(source, target, always_xy=True)
+        self._inverse = Transformer.from_crs(target, source, always_xy=True)
+
+        return None
+
+
+    def forward(self, lat, lng):
+        """Transform latitude and longitude arrays to (northing, easting) arrays"""
+        x, y = self._forward.transform(np.asarray(lng, dtype=float), np.asarray(lat, dtype=float))
+        return y, x
+
+
+    def inverse(self, northing, easting):
+        """Transform northing and easting arrays to (lat, lng) arrays"""
+        lng, lat = self._inverse.transform(np.asarray(easting, dtype=float), np.asarray(northing, dtype=float))
+        return lat, lng
+
+
+    def forward_points(self, points):
+        """Transform an (n, 2) array of (lat, lng) points to (northing, easting) points"""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        return np.column_stack(self.forward(points[:, 0], points[:, 1]))
+
+
+    def inverse_points(self, points):
+        """Transform an (n, 2) array of (easting, northing) points to (lat, lng) points"""
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        return np.column_stack(self.inverse(points[:, 1], points[:, 0]))
+
+
+    def forward_geometry(self, geometry):
+        """Transform a shapely geometry in (lng, lat) to (easting, northing)"""
+        return transform(lambda lng, lat: self.forward(lat, lng)[::-1], geometry)
+
 
+PROJECTION = Projection()
+
+
+def clip(cells, area):
+    """
+    Intersect a list of grid cells with a projected area. Cells with no overlap are
+    dropped and cells on the boundary are cut down to the part inside the area.
+    """
+    boxes = [Polygon(cell) for cell in cells]
+    tree = shapely.STRtree(boxes)
+    shapely.prepare(area)
+
+    clipped = []
+    for i in sorted(tree.query(area, predicate='intersects')):
+        if area.contains(boxes[i]):
+            clipped.append(cells[i])
+            continue
+        piece = boxes[i].intersection(area)
+        for part in getattr(piece, 'geoms', [piece]):
+            if isinstance(part, Polygon) and part.area > 0:
+                clipped.append([(round(x, 1), round(y, 1)) for x, y in part.exterior.coords])
+
+    return clipped
+
+
+# Root of the Spin land titles application; Spin can be pointed elsewhere, e.g. a simulator
+SPIN_URL = 'https://alta.registries.gov.ab.ca/SpinII'
+
+# Title DataFrame columns and the parsed payload keys they are filled from
+TITLE_COLUMNS = [
+    ('linc', 'linc'),
+    ('short_legal', 'short_legal'),
+    ('title_number', 'title_number'),
+    ('ats_reference', 'ats_reference'),
+    ('municipality', 'municipality'),
+    ('registration', 'registration'),
+    ('registration_date', 'date'),
+    ('document_type', 'document_type'),
+    ('sworn_value', 'value'),
+    ('consideration', 'consideration'),
+    ('condo', 'condo')
+]
+
+
+def assemble(index, payloads):
+    """
+    Builds the title DataFrame in one pass from parsed payloads keyed by title number.
+    Values are gathered column by column and typed once; titles without a payload are
+    left as missing values.
+    """
+    columns = {column: [] for column, key in TITLE_COLUMNS}
+    for title in index:
+        payload = payloads.get(str(title))
+        for column, key in TITLE_COLUMNS:
+            columns[column].append(payload[key] if payload is not None else None)
+
+    def numeric(values):
+        return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+    return pd.DataFrame({
+        'linc': pd.array(columns['linc'], dtype='Int64'),
+        'short_legal': columns['short_legal'],
+        'title_number': columns['title_number'],
+        'ats_reference': columns['ats_reference'],
+        'municipality': columns['municipality'],
+        'registration': columns['registration'],
+        'registration_date': pd.to_datetime(columns['registration_date'], format='%Y-%m-%d', errors='coerce'),
+        'document_type': columns['document_type'],
+        'sworn_value': numeric(columns['sworn_value']),
+        'consideration': numeric(columns['consideration']),
+        'condo': np.array([bool(v) for v in columns['condo']], dtype=bool)
+    }, index=index)
+
+
+# File extension of each format a run's journal, dataframe and geodataframe can take
+FORMATS = {'parquet': 'parquet', 'flatgeobuf': 'fgb', 'geojson': 'geojson', 'pickle': 'pkl'}
+
+
+def artifact(runtime, stage, format='parquet'):
+    """
+    Path of a run's journal, dataframe or geodataframe. Only geodataframes can be
+    FlatGeobuf or GeoJSON; tables in those runs are kept as Parquet.
+    """
+    if stage != 'geodataframe' and format in ('flatgeobuf', 'geojson'):
+        format = 'parquet'
+    return 'run/{}.{}.{}'.format(runtime, stage, FORMATS[format])
+
+
+def find_artifact(runtime, stage):
+    """Path of a run's saved stage in whichever format it was written, or None"""
+    for extension in FORMATS.values():
+        path = 'run/{}.{}.{}'.format(runtime, stage, extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+@metrics.timed('io.write_frame')
+def write_frame(frame, path):
+    """
+    Write a DataFrame or GeoDataFrame in the format its extension names: zstd compressed
+    Parquet (GeoParquet for geometries), FlatGeobuf, GeoJSON, or a pickle. FlatGeobuf
+    always gets a spatial index, which cannot hold empty geometries, so only located
+    rows are written to it; unlocated titles remain in the run's dataframe. Dates become
+    strings and flags integers in GeoJSON, which has no types.
+    """
+    extension = os.path.splitext(path)[1].lstrip('.')
+    if extension == 'pkl':
+        frame.to_pickle(path)
+    elif extension == 'parquet':
+        frame.to_parquet(path, compression='zstd')
+    elif extension == 'fgb':
+        located = ~(frame.geometry.isna() | frame.geometry.is_empty)
+        if not located.all():
+            click.echo('{} of {} rows have no location and are left out of {}'.format(
+                int((~located).sum()), len(frame), path))
+        frame[located].to_file(path, driver='FlatGeobuf', spatial_index=True)
+    elif extension == 'geojson':
+        frame = frame.copy()
+        for column in frame.columns:
+            if pd.api.types.is_datetime64_any_dtype(frame[column]):
+                frame[column] = frame[column].astype(str)
+            elif pd.api.types.is_bool_dtype(frame[column]):
+                frame[column] = frame[column].astype(int)
+        frame.to_file(path, driver='GeoJSON')
+    else:
+        raise ValueError('No format for {}'.format(path))
+
+
+@metrics.timed('io.read_frame')
+def read_frame(path, columns=None):
+    """
+    Read a frame written by write_frame, or a legacy pickle or GeoJSON. With columns,
+    only those are read, and geometry is skipped unless asked for.
+    """
+    extension = os.path.splitext(path)[1].lstrip('.')
+    if extension == 'pkl':
+        frame = pd.read_pickle(path)
+        return frame[columns] if columns else frame
+    if extension == 'parquet':
+        if columns is None or 'geometry' in columns:
+            try:
+                return gpd.read_parquet(path, columns=columns)
+            except ValueError:
+                pass
+        return pd.read_parquet(path, columns=columns)
+    if columns is None:
+        return gpd.read_file(path)
+    return gpd.read_file(path, columns=[c for c in columns if c != 'geometry'],
+                         ignore_geometry='geometry' not in columns)
+
+
+class Gazetteer:
+    """
+    Local gazetteer of Alberta localities, mapping names to a viewport and optionally a
+    boundary polygon. Entries come from boundary files imported once, and from Google
+    geocoder results, which expire after ttl. Names are matched loosely, so "Town of
+    Okotoks" and "okotoks, ab" find the same entry.
+    """
+    PREFIXES = re.compile(r"^(city|town|village|summer village|county|municipal district|md) of ")
+    SUFFIXES = re.compile(r",? *(ab|alberta|canada)$")
+
+    def __init__(self, path='data/gazetteer.db', ttl=180 * 24 * 3600, cutoff=0.85):
+        self.path = path
+        self.ttl = ttl
+        self.cutoff = cutoff
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS localities (name TEXT PRIMARY KEY, formatted TEXT, north REAL, '
+            'east REAL, south REAL, west REAL, polygon TEXT, source TEXT, fetched REAL)'
+        )
+
+        return None
+
+
+    def normalize(self, name):
+        name = re.sub(r"[^a-z0-9, ]+", ' ', name.lower())
+        name = re.sub(r" +", ' ', name).strip()
+        name = self.SUFFIXES.sub('', self.PREFIXES.sub('', name))
+        return name.strip(' ,')
+
+
+    def lookup(self, name):
+        """The closest fresh entry for a name as (formatted, viewport, polygon), or None"""
+        key = self.normalize(name)
+        names = [row[0] for row in self.db.execute('SELECT name FROM localities')]
+        matches = [key] if key in names else get_close_matches(key, names, n=1, cutoff=self.cutoff)
+        if not matches:
+            return None
+
+        formatted, north, east, south, west, polygon, source, fetched = self.db.execute(
+            'SELECT formatted, north, east, south, west, polygon, source, fetched FROM localities WHERE name = ?',
+            (matches[0],)).fetchone()
+        if source == 'google' and time() - fetched > self.ttl:
+            return None
+        viewport = dict(northeast=dict(lat=north, lng=east), southwest=dict(lat=south, lng=west))
+        return formatted, viewport, wkt.loads(polygon) if polygon else None
+
+
+    def record(self, name, formatted, viewport, polygon=None, source='google'):
+        self.db.execute('INSERT OR REPLACE INTO localities VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+            self.normalize(name), formatted,
+            viewport['northeast']['lat'], viewport['northeast']['lng'],
+            viewport['southwest']['lat'], viewport['southwest']['lng'],
+            polygon.wkt if polygon is not None else None, source, time()))
+
+
+    def load(self, path, field):
+        """Import every feature of a GeoJSON boundary file under the name in its field property"""
+        with open(path, "r") as f:
+            features = json.load(f)['features']
+        for feature in features:
+            name = feature['properties'][field]
+            polygon = shape(feature['geometry'])
+            lng_min, lat_min, lng_max, lat_max = polygon.bounds
+            viewport = dict(northeast=dict(lat=lat_max, lng=lng_max), southwest=dict(lat=lat_min, lng=lng_min))
+            self.record(name, name, viewport, polygon, source='import')
+        return len(features)
+
+
+    def localities(self):
+        return self.db.execute('SELECT formatted, source, fetched FROM localities ORDER BY name').fetchall()
 
 
 class Geography:
-    def __init__(self, locality=False):
+    def __init__(self, locality=False, density=200, adaptive=False, area=None, gazetteer=None, limit=500,
+                 minimum=100):
         """
         Geocodes a bounding box around a given community or area. the 'geography' attribute
-        will hold the matrix of coordinates to pass to Spin.
+        will hold the matrix of coordinates to pass to Spin, or a Quadtree search plan
+        seeded with coarse cells if adaptive is set, dividing cells whose tables reach
+        limit titles down to minimum metres. An area (GeoJSON file, WKT or shapely
+        geometry in GPS coordinates) replaces the geocoded viewport and clips the grid.
+        Localities are looked up in the gazetteer before Google is asked.
         """
-        self.google = googlemaps.Client(key=os.environ['GOOGLE_API_KEY'])
+        self.area = self.shape(area) if area is not None else None
+        self.gazetteer = gazetteer
+        self._google = None
 
         if locality:
             self.bounds = self.bound(locality)
-            self.northeast, self.southwest = self.nad83(self.bounds.northeast), self.nad83(self.bounds.southwest)
-            self.geography = self.grid(self.northeast, self.southwest)
+            corners = PROJECTION.forward_points([self.bounds.northeast, self.bounds.southwest])
+            self.northeast, self.southwest = tuple(map(float, corners[0])), tuple(map(float, corners[1]))
+            self.projected = None
+            if self.area is not None:
+                self.projected = PROJECTION.forward_geometry(self.area)
+                x_min, y_min, x_max, y_max = self.projected.bounds
+                self.northeast, self.southwest = (y_max, x_max), (y_min, x_min)
+            self.geography = self.grid(self.northeast, self.southwest, density)
+            if self.projected is not None:
+                self.geography = clip(self.geography, self.projected)
+            if adaptive:
+                self.geography = Quadtree(self.geography, minimum=minimum, limit=limit, area=self.projected)
 
         return None
 
 
+    @property
+    def google(self):
+        """Google Maps client, built on first use so offline lookups never need a key"""
+        if self._google is None:
+            if 'GOOGLE_API_KEY' not in os.environ:
+                raise click.ClickException('GOOGLE_API_KEY must be set to geocode localities missing from the gazetteer')
+            self._google = googlemaps.Client(key=os.environ['GOOGLE_API_KEY'])
+        return self._google
+
+
     def bound(self, locality, province='Alberta', country='Canada'):
         """
-        Returns a GPS named tuple with resolved address and bound coordinates using
-        Google's googlemaps API. GOOGLE_API_KEY must be set in Environment Variables.
+        Returns a GPS named tuple with resolved address and bound coordinates. Manual
+        bounds and areas are used as given; named localities come from the gazetteer,
+        whose boundary polygon becomes the search area, or on a miss from Google's
+        geocoder with GOOGLE_API_KEY set in Environment Variables.
         """
         filters = {
             'administrative_area': province,
@@ -62,10 +375,27 @@ class Geography:
             viewport['southwest']['lat'] = points_sw[0]
             viewport['southwest']['lng'] = points_sw[1]
             formatted_address = 'Manual Bounds'
+        elif self.area is not None:
+            lng_min, lat_min, lng_max, lat_max = self.area.bounds
+            viewport = dict(
+                northeast=dict(lat=lat_max, lng=lng_max),
+                southwest=dict(lat=lat_min, lng=lng_min)
+            )
+            formatted_address = locality
         else:
-            result = self.google.geocode(locality, components=filters)[0]
-            formatted_address = result['formatted_address']
-            viewport = result['geometry']['viewport']
+            found = self.gazetteer.lookup(locality) if self.gazetteer else None
+            metrics.count('gazetteer.hit' if found else 'gazetteer.miss')
+            if found:
+                formatted_address, viewport, polygon = found
+                if polygon is not None:
+                    self.area = polygon
+            else:
+                with metrics.span('http.geocode', locality=locality):
+                    result = self.google.geocode(locality, components=filters)[0]
+                formatted_address = result['formatted_address']
+                viewport = result['geometry']['viewport']
+                if self.gazetteer:
+                    self.gazetteer.record(locality, formatted_address, viewport)
 
         northeast = (viewport['northeast']['lat'], viewport['northeast']['lng'])
         southwest = (viewport['southwest']['lat'], viewport['southwest']['lng'])
@@ -79,33 +409,41 @@ class Geography:
         return value
 
 
+    def shape(self, area):
+        """
+        Loads a search area from a shapely geometry, a GeoJSON file or a WKT string.
+        Feature collections are merged into a single (multi)polygon.
+        """
+        if isinstance(area, BaseGeometry):
+            return area
+        if os.path.exists(area):
+            with open(area, "r") as f:
+                data = json.load(f)
+            if data['type'] == 'FeatureCollection':
+                return unary_union([shape(f['geometry']) for f in data['features']])
+            if data['type'] == 'Feature':
+                return shape(data['geometry'])
+            return shape(data)
+        return wkt.loads(area)
+
+
     def nad83(self, coordinates, reverse=False):
         """
-        Uses the EPSG API to convert GPS coordinate tuple to Alberta 10-TM Forest coordinates
+        Converts a GPS (lat, lng) coordinate tuple to Alberta 10-TM (northing, easting).
+        With reverse, converts an Alberta 10-TM (easting, northing) tuple back to GPS
+        (lat, lng). Batches of points should go through PROJECTION directly.
         """
-        payload = {
-            'format': 'json',
-            's_srs': 4326,
-            't_srs': 3401,
-            'x': coordinates[1],
-            'y': coordinates[0]
-        }
         if reverse:
-            payload['s_srs'], payload['t_srs'] = payload['t_srs'], payload['s_srs']
-            payload['x'], payload['y'] = payload['y'], payload['x']
-
-        url = 'http://epsg.io/trans'
-        r = requests.get(url, params=payload)
-        try:
-            data = r.json()
-        except ValueError:
-            data = dict(y='0', x='0')
+            point = PROJECTION.inverse_points(coordinates)[0]
+        else:
+            point = PROJECTION.forward_points(coordinates)[0]
 
-        value = (float(data['y']), float(data['x']))
+        value = (float(point[0]), float(point[1]))
         return value
 
 
-    def grid(self, northeast, southwest, density=200):
+    @staticmethod
+    def grid(northeast, southwest, density=200):
         """
         Break a bounding box into a mesh for some grid searchin'
         """
@@ -131,48 +469,910 @@ class Geography:
         return master
 
 
-class Spin:
+class Quadtree:
     """
-    Interface with land titles. Will return a 'dataframe' attribute with titles
+    Adaptive search plan. Starts from a list of coarse cells and subdivides any cell
+    whose search returns a table that looks truncated, down to a minimum cell size.
+    Cells that come back empty are dropped without further requests, and failed
+    searches are retried by Spin rather than divided. By default a
+    table of 500 titles counts as truncated and cells stop dividing below 100 metres,
+    half the fixed grid's default quadrant; terra's --split-at and --min-cell set them.
     """
-    def __init__(self, grid=False, pull_period=False, journal=False):
-        self.runtime = time()
-        self.session = self.authenticate()
-        self.data = []
+    def __init__(self, cells, minimum=100, limit=500, area=None):
+        self.cells = deque(cells)
+        self.area = area
+        self.minimum = minimum
+        self.limit = limit
+        self.searched = 0
+        self.divided = 0
 
-        if journal:
-            self.journal = pd.read_pickle(journal)
-            if pull_period:
-                self.pull(pull_period)
+        return None
+
+
+    def __len__(self):
+        return len(self.cells)
+
+
+    def pop(self):
+        """Take the next cell to search"""
+        self.searched += 1
+        return self.cells.popleft()
+
+
+    def truncated(self, df):
+        """A table at or over the limit needs a finer search"""
+        return df is not None and len(df) >= self.limit
+
+
+    def divide(self, polygon):
+        """
+        Queue the four quadrants of a cell's bounding box, moving clockwise from the
+        southwest corner and clipped to the search area. Returns the new cells, or an
+        empty list if the cell is already at minimum size.
+        """
+        xs, ys = [x for x, y in polygon], [y for x, y in polygon]
+        x_min, y_min = min(xs), min(ys)
+        width, height = (max(xs) - x_min) / 2, (max(ys) - y_min) / 2
+        if max(width, height) < self.minimum:
+            return []
+        if width == int(width) and height == int(height):
+            width, height = int(width), int(height)
+
+        children = []
+        for x in (x_min, x_min + width):
+            for y in (y_min, y_min + height):
+                children.append([
+                    (x, y),
+                    (x, y + height),
+                    (x + width, y + height),
+                    (x + width, y),
+                    (x, y)
+                ])
+        if self.area is not None:
+            children = clip(children, self.area)
+
+        self.cells.extend(children)
+        self.divided += 1
+        return children
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every worker so the total request rate stays within budget
+    no matter how many requests are in flight. Refills at 'rate' tokens per second and
+    holds at most 'burst' tokens.
+    """
+    def __init__(self, rate=0.5, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = monotonic()
+        self.lock = Lock()
+
+        return None
+
+
+    def acquire(self):
+        """Block until the caller may send one request"""
+        with self.lock:
+            now = monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0
+        if delay > 0:
+            with metrics.span('rate.wait'):
+                sleep(delay)
+
+
+    def feedback(self, ok, latency=None):
+        """Report how a request went; a fixed rate ignores it"""
+        pass
+
+
+class RateController(RateLimiter):
+    """
+    Rate limiter that adapts to how the registry is coping. Healthy responses raise the
+    rate additively, by step requests per second every second (a fiftieth of the ceiling
+    unless given); a slow response, an HTTP error or a garbled page cuts it by factor and
+    holds the next request back for a random fraction of the new interval. The rate
+    never rises above ceiling, which is rate unless given, and starts at rate if that is
+    below the ceiling or at half the ceiling otherwise. Controllers pacing different
+    kinds of request can draw on one budget, a RateLimiter at the registry's ceiling,
+    so together they never exceed it. The current rate is kept as the name gauge.
+    """
+    def __init__(self, rate=0.5, ceiling=None, floor=0.05, step=None, factor=0.5, slow=10.0, burst=1,
+                 budget=None, name='rate.http'):
+        self.ceiling = ceiling if ceiling else rate
+        super().__init__(rate if rate < self.ceiling else self.ceiling / 2, burst)
+        self.floor = min(floor, self.rate)
+        self.step = step if step else self.ceiling / 50
+        self.factor = factor
+        self.slow = slow
+        self.budget = budget
+        self.name = name
+        self.backoffs = 0
+        self.peak = self.trough = self.rate
+        metrics.gauge(self.name, self.rate)
+
+        return None
+
+
+    def acquire(self):
+        """Block until this controller, and then the shared budget, allow one request"""
+        super().acquire()
+        if self.budget:
+            self.budget.acquire()
+
+
+    def feedback(self, ok, latency=None):
+        with self.lock:
+            if ok and (latency is None or latency < self.slow):
+                self.rate = min(self.ceiling, self.rate + self.step / self.rate)
+                self.peak = max(self.peak, self.rate)
+            else:
+                self.rate = max(self.floor, self.rate * self.factor)
+                self.tokens = min(self.tokens, 0) - random()
+                self.backoffs += 1
+                metrics.count('rate.backoffs')
+                self.trough = min(self.trough, self.rate)
+            metrics.gauge(self.name, self.rate)
+
+
+    def summary(self):
+        return 'Request rate {:.2f}/s (ranged {:.2f} to {:.2f}/s, ceiling {:.2f}/s) after {} backoffs'.format(
+            self.rate, self.trough, self.peak, self.ceiling, self.backoffs)
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of response bodies keyed by URL and parameters.
+    Spatial searches and titles carry separate TTLs, and the least recently used
+    entries are evicted once the cache grows past max_bytes.
+    """
+    def __init__(self, directory='data/cache', max_bytes=2 * 1024 ** 3,
+                 search_ttl=24 * 3600, title_ttl=180 * 24 * 3600):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.search_ttl = search_ttl
+        self.title_ttl = title_ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+        self.size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+        return None
+
+
+    def path(self, url, params=None):
+        """Hash the URL and sorted parameters into the entry's filename"""
+        params = sorted((str(k), str(v)) for k, v in (params or {}).items())
+        digest = hashlib.sha256(json.dumps([url, params]).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest)
+
+
+    def get(self, url, params=None, ttl=None):
+        """Return the cached body, or None if it is missing or older than ttl seconds"""
+        path = self.path(url, params)
+        content = None
+        try:
+            stat = os.stat(path)
+            if ttl is None or time() - stat.st_mtime <= ttl:
+                with open(path, "rb") as f:
+                    content = f.read()
+                # Access time tracks recency for eviction, modification time tracks age
+                os.utime(path, (time(), stat.st_mtime))
+        except FileNotFoundError:
+            pass
+
+        with self.lock:
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.count('cache.miss' if content is None else 'cache.hit')
+        return content
+
+
+    def put(self, url, params, content):
+        """Store a response body, evicting least recently used entries if over budget"""
+        path = self.path(url, params)
+        temp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temp, "wb") as f:
+            f.write(content)
+
+        with self.lock:
+            try:
+                self.size -= os.stat(path).st_size
+            except FileNotFoundError:
+                pass
+            os.replace(temp, path)
+            self.size += len(content)
+            if self.size > self.max_bytes:
+                self.evict()
+
+
+    def evict(self):
+        """Remove least recently used entries until the cache is back under 90% of budget"""
+        entries = sorted((e for e in os.scandir(self.directory) if e.is_file()),
+                         key=lambda e: e.stat().st_atime)
+        for entry in entries:
+            if self.size <= self.max_bytes * 0.9:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self.size -= size
+            except FileNotFoundError:
+                pass
+
+
+    def summary(self):
+        """Hit and miss counters for reporting"""
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return 'Cache: {} hits, {} misses ({:.0%} hit rate)'.format(self.hits, self.misses, rate)
+
+
+class Progress:
+    """
+    Durable record of a run's completed work in SQLite (WAL mode). Each grid cell, parsed
+    title and mapped LINC is written as soon as it finishes, so an interrupted run can be
+    resumed by its runtime without repeating any of it.
+    """
+    def __init__(self, runtime=None, directory='run'):
+        self.runtime = runtime if runtime is not None else time()
+        self.path = self.locate(self.runtime, directory)
+        self.lock = Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS cells (polygon TEXT PRIMARY KEY, result BLOB)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS titles (title TEXT PRIMARY KEY, payload BLOB)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS sites (linc INTEGER PRIMARY KEY, lng REAL, lat REAL)')
+
+        return None
+
+
+    @classmethod
+    def locate(cls, runtime, directory='run'):
+        """Path of the progress store for a given runtime"""
+        return os.path.join(directory, '{}.progress.db'.format(runtime))
+
+
+    def execute(self, sql, parameters=()):
+        with self.lock:
+            return self.db.execute(sql, parameters).fetchall()
+
+
+    def configure(self, options):
+        """Save the options a run was started with"""
+        self.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', ('options', json.dumps(options)))
+
+
+    def config(self):
+        """Load the options a run was started with"""
+        rows = self.execute('SELECT value FROM meta WHERE key = ?', ('options',))
+        return json.loads(rows[0][0]) if rows else {}
+
+
+    def cell(self, polygon):
+        """Returns (found, result) for a grid cell searched in an earlier attempt"""
+        rows = self.execute('SELECT result FROM cells WHERE polygon = ?', (json.dumps(polygon),))
+        if not rows:
+            return False, None
+        return True, pickle.loads(rows[0][0])
+
+
+    def record_cell(self, polygon, df):
+        self.execute('INSERT OR REPLACE INTO cells VALUES (?, ?)', (json.dumps(polygon), pickle.dumps(df)))
+
+
+    def titles(self):
+        """Parsed payloads of every title completed so far, keyed by title number"""
+        return {title: pickle.loads(payload)
+                for title, payload in self.execute('SELECT title, payload FROM titles')}
+
+
+    def record_title(self, index, payload):
+        payload = {k: v for k, v in payload.items() if k != 'title_text'}
+        self.execute('INSERT OR REPLACE INTO titles VALUES (?, ?)', (str(index), pickle.dumps(payload)))
+
+
+    def sites(self):
+        """GPS points of every LINC mapped so far"""
+        return {linc: (lng, lat) for linc, lng, lat in self.execute('SELECT linc, lng, lat FROM sites')}
+
+
+    def record_site(self, linc, point):
+        self.execute('INSERT OR REPLACE INTO sites VALUES (?, ?, ?)', (linc, point[0], point[1]))
+
+
+class TitleStore:
+    """
+    Persistent per-locality record of every title pulled, keyed by title number with its
+    registration date, parsed payload and mapped location, so a later run only has to
+    retrieve and map what changed since the last one. Each locality's last completed run
+    is kept with the registration date period it pulled, which later runs reuse.
+    """
+    def __init__(self, locality, path='data/titles.db'):
+        self.locality = locality.strip().lower()
+        self.lock = Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS titles (locality TEXT, title TEXT, registered TEXT, '
+            'linc INTEGER, payload BLOB, lng REAL, lat REAL, PRIMARY KEY (locality, title))'
+        )
+        self.db.execute('CREATE TABLE IF NOT EXISTS runs (locality TEXT PRIMARY KEY, runtime REAL, period TEXT)')
+        if 'period' not in [row[1] for row in self.db.execute('PRAGMA table_info(runs)')]:
+            self.db.execute('ALTER TABLE runs ADD COLUMN period TEXT')
+
+        return None
+
+
+    def execute(self, sql, parameters=()):
+        with self.lock:
+            return self.db.execute(sql, parameters).fetchall()
+
+
+    def last_run(self):
+        """Runtime and period of the last completed run for this locality, or None"""
+        rows = self.execute('SELECT runtime, period FROM runs WHERE locality = ?', (self.locality,))
+        return rows[0] if rows else None
+
+
+    def payload(self, title, registered):
+        """Stored payload of one title if its registration date is unchanged, or None"""
+        rows = self.execute('SELECT payload FROM titles WHERE locality = ? AND title = ? AND registered = ?',
+                            (self.locality, str(title), str(registered)))
+        return pickle.loads(rows[0][0]) if rows else None
+
+
+    def payloads(self, registered):
+        """
+        Stored payloads of titles whose registration date is unchanged, given a Series of
+        registration dates indexed by title number
+        """
+        rows = self.execute('SELECT title, registered, payload FROM titles WHERE locality = ?', (self.locality,))
+        stored = {title: (date, payload) for title, date, payload in rows}
+        unchanged = {}
+        for index, date in registered.items():
+            if str(index) in stored and stored[str(index)][0] == str(date):
+                unchanged[str(index)] = pickle.loads(stored[str(index)][1])
+        return unchanged
+
+
+    def record_titles(self, registered, payloads):
+        """Upsert parsed payloads along with their journal registration dates"""
+        rows = []
+        for index, date in registered.items():
+            payload = payloads.get(str(index))
+            if payload is not None:
+                payload = {k: v for k, v in payload.items() if k != 'title_text'}
+                rows.append((self.locality, str(index), str(date), payload['linc'], pickle.dumps(payload)))
+        with self.lock:
+            self.db.execute('BEGIN')
+            self.db.executemany(
+                'INSERT INTO titles (locality, title, registered, linc, payload) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (locality, title) DO UPDATE SET registered = excluded.registered, '
+                'linc = excluded.linc, payload = excluded.payload', rows
+            )
+            self.db.execute('COMMIT')
+
+
+    def sites(self):
+        """GPS points of every LINC already mapped for this locality"""
+        rows = self.execute('SELECT linc, lng, lat FROM titles WHERE locality = ? AND lng IS NOT NULL',
+                            (self.locality,))
+        return {linc: (lng, lat) for linc, lng, lat in rows}
+
+
+    def record_sites(self, sites):
+        """Attach mapped GPS points to every stored title on each LINC"""
+        with self.lock:
+            self.db.execute('BEGIN')
+            self.db.executemany('UPDATE titles SET lng = ?, lat = ? WHERE locality = ? AND linc = ?',
+                                [(point[0], point[1], self.locality, linc) for linc, point in sites.items()])
+            self.db.execute('COMMIT')
+
+
+    def finish(self, runtime, period):
+        self.execute('INSERT OR REPLACE INTO runs (locality, runtime, period) VALUES (?, ?, ?)',
+                     (self.locality, float(runtime), str(period)))
+
+
+class Warehouse:
+    """
+    Local spatial store of every title a run has located, indexed with an SQLite R-tree
+    so area queries answer from disk. Searched grid cells are kept with the time they
+    were searched, in Alberta 10-TM, along with the registration date cutoff of the run
+    and whether it kept condos, so a later query only goes back to Spin for the parts
+    of its area that have gone stale or were searched too narrowly to answer it.
+    """
+    COLUMNS = ['linc', 'short_legal', 'title_number', 'ats_reference', 'municipality', 'registration',
+               'registration_date', 'document_type', 'sworn_value', 'consideration', 'condo']
+
+    def __init__(self, path='data/warehouse.db'):
+        self.path = path
+        self.lock = Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS titles (id INTEGER PRIMARY KEY, title TEXT UNIQUE, {}, lng REAL, lat REAL, '
+            'updated REAL)'.format(', '.join(self.COLUMNS))
+        )
+        self.db.execute('CREATE VIRTUAL TABLE IF NOT EXISTS title_index USING rtree(id, west, east, south, north)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS cells (id INTEGER PRIMARY KEY, polygon TEXT UNIQUE, searched REAL, '
+                        'since TEXT, condos INTEGER)')
+        # Cells recorded before cutoffs were kept have neither, and so always count as stale
+        columns = [row[1] for row in self.db.execute('PRAGMA table_info(cells)')]
+        for column, kind in (('since', 'TEXT'), ('condos', 'INTEGER')):
+            if column not in columns:
+                self.db.execute('ALTER TABLE cells ADD COLUMN {} {}'.format(column, kind))
+        self.db.execute('CREATE VIRTUAL TABLE IF NOT EXISTS cell_index USING rtree(id, west, east, south, north)')
+
+        return None
+
+
+    def upsert(self, geodataframe):
+        """Insert or refresh every located title of a run's geodataframe"""
+        frame = geodataframe[~geodataframe.geometry.is_empty & geodataframe['title_number'].notna()]
+        now = time()
+        rows = []
+        for values, point in zip(frame[self.COLUMNS].itertuples(index=False, name=None), frame.geometry):
+            values = [None if not isinstance(v, str) and pd.isna(v) else v for v in values]
+            values[0] = int(values[0]) if values[0] is not None else None
+            values[6] = str(values[6])[:10] if values[6] is not None else None
+            values[10] = bool(values[10])
+            rows.append([normalize_title(values[2])] + values + [point.x, point.y, now])
+
+        with self.lock:
+            self.db.execute('BEGIN')
+            for row in rows:
+                self.db.execute(
+                    'INSERT INTO titles (title, {0}, lng, lat, updated) VALUES ({1}) ON CONFLICT (title) DO UPDATE '
+                    'SET {2}'.format(', '.join(self.COLUMNS), ', '.join('?' * (len(self.COLUMNS) + 4)),
+                                     ', '.join('{0} = excluded.{0}'.format(c) for c in self.COLUMNS + ['lng', 'lat', 'updated'])),
+                    row)
+                id = self.db.execute('SELECT id FROM titles WHERE title = ?', (row[0],)).fetchone()[0]
+                self.db.execute('INSERT OR REPLACE INTO title_index VALUES (?, ?, ?, ?, ?)',
+                                (id, row[-3], row[-3], row[-2], row[-2]))
+            self.db.execute('COMMIT')
+        return len(rows)
+
+
+    @staticmethod
+    def day(since):
+        """A registration date cutoff as YYYY-MM-DD, or '' for none"""
+        return pd.Timestamp(since).strftime('%Y-%m-%d') if since else ''
+
+
+    def record_cells(self, cells, since=None, condos=True, searched=None):
+        """
+        Mark projected grid cells as searched, now unless a time is given, for titles
+        registered since a date and with or without condos
+        """
+        searched = searched or time()
+        with self.lock:
+            self.db.execute('BEGIN')
+            for cell in cells:
+                key = json.dumps([list(map(float, point)) for point in cell])
+                self.db.execute('INSERT INTO cells (polygon, searched, since, condos) VALUES (?, ?, ?, ?) '
+                                'ON CONFLICT (polygon) DO UPDATE SET searched = excluded.searched, '
+                                'since = excluded.since, condos = excluded.condos',
+                                (key, searched, self.day(since), int(bool(condos))))
+                id = self.db.execute('SELECT id FROM cells WHERE polygon = ?', (key,)).fetchone()[0]
+                x_min, y_min, x_max, y_max = Polygon(cell).bounds
+                self.db.execute('INSERT OR REPLACE INTO cell_index VALUES (?, ?, ?, ?, ?)',
+                                (id, x_min, x_max, y_min, y_max))
+            self.db.execute('COMMIT')
+
+
+    def stale(self, cells, max_age, since=None):
+        """
+        The projected grid cells not wholly covered by cells searched within max_age
+        seconds, for every title registered since a date, condos included
+        """
+        cutoff = time() - max_age
+        stale = []
+        for cell in cells:
+            box = Polygon(cell)
+            x_min, y_min, x_max, y_max = box.bounds
+            with self.lock:
+                rows = self.db.execute(
+                    'SELECT c.polygon FROM cell_index i JOIN cells c ON c.id = i.id WHERE i.west < ? AND i.east > ? '
+                    'AND i.south < ? AND i.north > ? AND c.searched >= ? AND c.condos = 1 AND c.since <= ?',
+                    (x_max, x_min, y_max, y_min, cutoff, self.day(since))
+                ).fetchall()
+            fresh = unary_union([Polygon(json.loads(polygon)) for polygon, in rows]) if rows else None
+            if fresh is None or not fresh.buffer(1e-6).contains(box):
+                stale.append(cell)
+        return stale
+
+
+    def query(self, area, since=None):
+        """Titles inside a GPS area, optionally registered on or after a date, as a GeoDataFrame"""
+        lng_min, lat_min, lng_max, lat_max = area.bounds
+        sql = ('SELECT t.title, {} , t.lng, t.lat FROM title_index i JOIN titles t ON t.id = i.id '
+               'WHERE i.west >= ? AND i.east <= ? AND i.south >= ? AND i.north <= ?').format(
+                   ', '.join('t.' + c for c in self.COLUMNS))
+        parameters = [lng_min, lng_max, lat_min, lat_max]
+        if since:
+            sql += ' AND t.registration_date >= ?'
+            parameters.append(str(since))
+        with self.lock:
+            rows = self.db.execute(sql, parameters).fetchall()
+
+        frame = pd.DataFrame(rows, columns=['title'] + self.COLUMNS + ['lng', 'lat'])
+        inside = shapely.intersects_xy(area, frame['lng'].to_numpy(dtype=float), frame['lat'].to_numpy(dtype=float))
+        frame = frame[inside].set_index('title')
+        frame['linc'] = frame['linc'].astype('Int64')
+        frame['registration_date'] = pd.to_datetime(frame['registration_date'], format='%Y-%m-%d', errors='coerce')
+        frame['condo'] = frame['condo'].astype(bool)
+        geometry = gpd.points_from_xy(frame.pop('lng'), frame.pop('lat'))
+        return gpd.GeoDataFrame(frame, geometry=geometry, crs='EPSG:4326')
+
+
+class BlobStore:
+    """
+    Append-only packed store for title texts and site plans. Blobs are appended to pack
+    files and found through an SQLite index by their SHA-256 digest, so an identical
+    site plan is stored once however many LINCs share it; names such as a title number
+    or LINC point at a digest. Title texts are zlib compressed against a preset
+    dictionary of the lines most titles share, built from the first titles stored.
+    """
+    def __init__(self, directory='data/blobs', pack_size=256 * 1024 ** 2, level=6, samples=200):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.pack_size = pack_size
+        self.level = level
+        self.samples = samples
+        self.sampled = []
+        self.lock = Lock()
+        self.readers = {}
+        self.db = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, pack INTEGER, offset INTEGER, '
+            'length INTEGER, size INTEGER, dictionary INTEGER)'
+        )
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS names (kind TEXT, name TEXT, digest TEXT, extension TEXT, stored REAL, '
+            'PRIMARY KEY (kind, name))'
+        )
+        self.db.execute('CREATE TABLE IF NOT EXISTS dictionaries (id INTEGER PRIMARY KEY, data BLOB)')
+        self.dictionaries = dict(self.db.execute('SELECT id, data FROM dictionaries').fetchall())
+        self.pack = self.db.execute('SELECT COALESCE(MAX(pack), 0) FROM blobs').fetchone()[0]
+
+        return None
+
+
+    def execute(self, sql, parameters=()):
+        with self.lock:
+            return self.db.execute(sql, parameters).fetchall()
+
+
+    def pack_path(self, pack):
+        return os.path.join(self.directory, 'pack-{:05d}.dat'.format(pack))
+
+
+    def train(self, texts):
+        """
+        Preset dictionary of the lines found in at least a quarter of the sample titles,
+        most common last where zlib reaches them most cheaply, within zlib's 32 KB window
+        """
+        counts = {}
+        for text in texts:
+            for line in set(text.split(b'\n')):
+                if len(line) > 3:
+                    counts[line] = counts.get(line, 0) + 1
+        common = sorted((count, line) for line, count in counts.items() if count >= len(texts) / 4)
+        return b'\n'.join(line for count, line in common)[-32 * 1024:]
+
+
+    def dictionary(self, data):
+        """
+        Id of the current title dictionary, training one once enough titles are sampled.
+        Other stores on the same directory may train it first, so the table is checked
+        again before a new one is trained and saved in the same transaction.
+        """
+        with self.lock:
+            if not self.dictionaries:
+                self.dictionaries.update(self.db.execute('SELECT id, data FROM dictionaries').fetchall())
+            if self.dictionaries:
+                return max(self.dictionaries)
+            self.sampled.append(data)
+            if len(self.sampled) < self.samples:
+                return None
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                rows = self.db.execute('SELECT id, data FROM dictionaries').fetchall()
+                if not rows:
+                    trained = self.train(self.sampled)
+                    rows = [(self.db.execute('INSERT INTO dictionaries (data) VALUES (?)', (trained,)).lastrowid,
+                             trained)]
+                self.db.execute('COMMIT')
+            except BaseException:
+                self.db.execute('ROLLBACK')
+                raise
+            self.sampled = []
+            self.dictionaries.update(rows)
+            return max(self.dictionaries)
+
+
+    def zdict(self, dictionary):
+        """A dictionary's bytes, read from the index on first use if another store trained it"""
+        if dictionary not in self.dictionaries:
+            rows = self.execute('SELECT data FROM dictionaries WHERE id = ?', (dictionary,))
+            if not rows:
+                raise KeyError('No title dictionary {} in {}'.format(dictionary, self.directory))
+            self.dictionaries[dictionary] = rows[0][0]
+        return self.dictionaries[dictionary]
+
+
+    def compress(self, data, dictionary):
+        if dictionary is None:
+            return zlib.compress(data, self.level)
+        compressor = zlib.compressobj(self.level, zdict=self.zdict(dictionary))
+        return compressor.compress(data) + compressor.flush()
+
+
+    def decompress(self, data, dictionary):
+        if dictionary is None:
+            return zlib.decompress(data)
+        decompressor = zlib.decompressobj(zdict=self.zdict(dictionary))
+        return decompressor.decompress(data) + decompressor.flush()
+
+
+    def append(self, data):
+        """
+        Append bytes to the current pack, returning the pack and offset. Packs are opened
+        for appending, so stores in other threads or processes never overwrite each other.
+        """
+        with self.lock:
+            path = self.pack_path(self.pack)
+            if os.path.exists(path) and os.path.getsize(path) + len(data) > self.pack_size:
+                self.pack += 1
+                path = self.pack_path(self.pack)
+            pack = self.pack
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            offset = os.lseek(fd, 0, os.SEEK_CUR) - len(data)
+        finally:
+            os.close(fd)
+        return pack, offset
+
+
+    def put(self, kind, name, data, extension, compress=False):
+        """
+        Store a blob under a kind and name, returning its digest. Content already in the
+        store is only pointed at; compress zlib compresses the rest.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        metrics.count('blobs.bytes_in', len(data))
+        if self.contains(digest):
+            metrics.count('blobs.deduplicated')
         else:
-            if grid:
-                self.fetch(grid)
-                self.bundle()
-                if pull_period:
-                    self.pull(pull_period)
+            dictionary = self.dictionary(data) if compress else None
+            stored = self.compress(data, dictionary) if compress else data
+            metrics.count('blobs.bytes_stored', len(stored))
+            pack, offset = self.append(stored)
+            self.execute('INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?, ?, ?)',
+                         (digest, pack, offset, len(stored), len(data), dictionary if compress else -1))
+        self.name(kind, name, digest, extension)
+        return digest
+
+
+    def name(self, kind, name, digest, extension):
+        self.execute('INSERT OR REPLACE INTO names VALUES (?, ?, ?, ?, ?)', (kind, str(name), digest, extension, time()))
+
+
+    def link(self, kind, name, source):
+        """Point a name at the blob another name holds, returning False if it has none"""
+        entry = self.entry(kind, source)
+        if entry is None:
+            return False
+        self.name(kind, name, *entry)
+        return True
+
+
+    def contains(self, digest):
+        return bool(self.execute('SELECT 1 FROM blobs WHERE digest = ?', (digest,)))
+
+
+    def entry(self, kind, name):
+        """The (digest, extension) stored under a name, or None"""
+        rows = self.execute('SELECT digest, extension FROM names WHERE kind = ? AND name = ?', (kind, str(name)))
+        return rows[0] if rows else None
+
+
+    def read(self, digest):
+        """Random access read of one blob by digest"""
+        rows = self.execute('SELECT pack, offset, length, dictionary FROM blobs WHERE digest = ?', (digest,))
+        if not rows:
+            return None
+        pack, offset, length, dictionary = rows[0]
+        with self.lock:
+            if pack not in self.readers:
+                self.readers[pack] = os.open(self.pack_path(pack), os.O_RDONLY)
+            fd = self.readers[pack]
+        data = os.pread(fd, length, offset)
+        metrics.count('blobs.bytes_read', length)
+        return data if dictionary == -1 else self.decompress(data, dictionary)
+
+
+    def get(self, kind, name):
+        """The blob stored under a name, or None"""
+        entry = self.entry(kind, name)
+        return self.read(entry[0]) if entry else None
+
+
+    def names(self, kind):
+        """(name, extension) of every blob of a kind, in the order they lie in the packs"""
+        return self.execute('SELECT n.name, n.extension FROM names n JOIN blobs b ON b.digest = n.digest '
+                            'WHERE n.kind = ? ORDER BY b.pack, b.offset', (kind,))
 
+
+    def stats(self):
+        """Counts and sizes of the names and distinct blobs of each kind"""
+        rows = self.execute('SELECT n.kind, COUNT(*), COUNT(DISTINCT n.digest), SUM(b.size) FROM names n '
+                            'JOIN blobs b ON b.digest = n.digest GROUP BY n.kind')
+        stored = self.execute('SELECT n.kind, SUM(b.size), SUM(b.length) FROM blobs b JOIN '
+                              '(SELECT DISTINCT kind, digest FROM names) n ON n.digest = b.digest GROUP BY n.kind')
+        stored = {kind: (size, length) for kind, size, length in stored}
+        return {kind: dict(names=count, blobs=blobs, size=size, unique=stored[kind][0], stored=stored[kind][1])
+                for kind, count, blobs, size in rows}
+
+
+    def close(self):
+        with self.lock:
+            for fd in self.readers.values():
+                os.close(fd)
+            self.readers = {}
         return None
 
 
-    def authenticate(self):
+def normalize_title(title):
+    """
+    Canonical form of a title number: spaces removed and any '+N' duplicate suffix zero
+    padded to three digits, so '052 123 456 +2' and '052123456+002' compare equal.
+    """
+    title = str(title)
+    if '+' in title:
+        number, suffix = title.split('+', 1)
+        title = number + suffix.strip().zfill(3)
+    return title.replace(' ', '')
+
+
+class JournalBuilder:
+    """
+    Builds the journal incrementally as quadrant tables arrive in Spin.fetch. Only current,
+    non-mineral titles are kept, and each title is stored once under its normalized number,
+    so memory grows with unique titles rather than with raw quadrant results.
+    """
+    def __init__(self):
+        self.columns = ['Type', 'Rights', 'Registration Date', 'Change/Cancel Date']
+        self.name = None
+        self.rows = {}
+        self.duplicates = 0
+
+        return None
+
+
+    def __len__(self):
+        return len(self.rows)
+
+
+    def add(self, df):
         """
-        Login to Spin as a guest and return the requests session
+        Filter a quadrant table and keep the first row seen for each title, returning the
+        (title, row) pairs that were new
         """
+        self.columns, self.name = list(df.columns), df.index.name
+        df = df[(df['Type'] == 'Current Title') & (df['Rights'] != 'Mineral')]
+        added = []
+        for index, row in zip(df.index, df.itertuples(index=False, name=None)):
+            key = normalize_title(index)
+            if key in self.rows:
+                self.duplicates += 1
+                continue
+            self.rows[key] = (index, row)
+            added.append((index, row))
+        return added
+
+
+    def frame(self):
+        """The journal as a DataFrame indexed by title number"""
+        index = pd.Index([index for index, row in self.rows.values()], name=self.name)
+        return pd.DataFrame([row for index, row in self.rows.values()], index=index, columns=self.columns)
+
+
+class LoginError(Exception):
+    """Spin would not log in a guest, or dropped the session straight after"""
+
+
+class SessionPool:
+    """
+    A small pool of Spin guest sessions shared by worker threads, each thread borrowing
+    one per request. Sessions are logged in on first use and their cookies and viewstate
+    saved to disk, so later runs reuse them. A response that lands back on the logon
+    page means the guest session expired; it is logged in again and the request retried.
+    """
+    # Most popular user agent strings, one chosen per session
+    AGENTS = [
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.113 Safari/537.36',
+        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/44.0.2403.157 Safari/537.36',
+        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_12_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.90 Safari/537.36'
+    ]
+
+    def __init__(self, base_url=SPIN_URL, size=1, path='data/sessions.json', attempts=2, limiter=None):
+        self.base_url = base_url.rstrip('/')
+        self.size = size
+        self.path = path
+        self.attempts = attempts
+        self.limiter = limiter
+        self.lock = Lock()
+        self.logins = 0
+        self.saved = self.load()
+        self.idle = Queue()
+        for slot in range(size):
+            self.idle.put(self.restore(self.saved[slot]) if slot < len(self.saved) else None)
+
+        return None
+
+
+    def load(self):
+        """Saved session states for this base URL, newest first"""
+        if not self.path or not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return []
+        return data['sessions'] if data.get('base_url') == self.base_url else []
 
-        # Choose a random user agent string from the most popular
-        agent_strings = [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.113 Safari/537.36',
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/44.0.2403.157 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_12_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.90 Safari/537.36'
-        ]
-        headers = {'User-Agent': choice(agent_strings)}
 
-        # Spin up a requests session
-        with requests.Session() as s:
-            s.headers.update(headers)
+    def save(self, session):
+        state = dict(cookies=requests.utils.dict_from_cookiejar(session.cookies), viewstate=session.viewstate,
+                     agent=session.headers['User-Agent'], created=time())
+        with self.lock:
+            self.saved = ([state] + self.saved)[:self.size]
+            if self.path:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                with open(self.path + '.part', "w") as f:
+                    json.dump(dict(base_url=self.base_url, sessions=self.saved), f)
+                os.replace(self.path + '.part', self.path)
 
-            login_page = s.get('https://alta.registries.gov.ab.ca/SpinII/').content
-            soup = BeautifulSoup(login_page, 'html.parser')
+
+    def session(self, agent=None):
+        s = requests.Session()
+        s.headers.update({'User-Agent': agent or choice(self.AGENTS)})
+        s.viewstate = None
+        return s
+
+
+    def restore(self, state):
+        s = self.session(state['agent'])
+        s.cookies.update(state['cookies'])
+        s.viewstate = state['viewstate']
+        return s
+
+
+    def login(self):
+        """
+        Login to Spin as a guest and return the requests session, raising LoginError if
+        Spin does not confirm it
+        """
+        s = self.session()
+        try:
+            login_page = self.send(s, 'GET', self.base_url + '/')
+            soup = BeautifulSoup(login_page.content, 'html.parser')
 
             login_payload = {
                 'uctrlFullHeader:ShutdownAlert1:Hidden1':'',
@@ -187,10 +1387,8 @@ class Spin:
             login_payload['__EVENTARGUMENT'] = soup.select_one('#__EVENTARGUMENT')['value']
             login_payload['__VIEWSTATE'] = soup.select_one('#__VIEWSTATE')['value']
 
-            sleep(2)
-            legal_notice_page = s.post('https://alta.registries.gov.ab.ca/SpinII/logon.aspx', \
-                    data=login_payload).content
-            soup = BeautifulSoup(legal_notice_page, 'html.parser')
+            legal_notice_page = self.send(s, 'POST', self.base_url + '/logon.aspx', data=login_payload)
+            soup = BeautifulSoup(legal_notice_page.content, 'html.parser')
 
             login_payload['__VIEWSTATE'] = soup.select_one('#__VIEWSTATE')['value']
             login_payload['cmdYES.x'] = 55
@@ -198,355 +1396,1443 @@ class Spin:
             del login_payload['__EVENTARGUMENT']
             del login_payload['__EVENTTARGET']
 
-            sleep(2)
-            confirm_guest_page = s.post('https://alta.registries.gov.ab.ca/SpinII/legalnotice.aspx', \
-                    data=login_payload).content
-            soup = BeautifulSoup(confirm_guest_page, 'html.parser')
+            confirm_guest_page = self.send(s, 'POST', self.base_url + '/legalnotice.aspx', data=login_payload)
+            soup = BeautifulSoup(confirm_guest_page.content, 'html.parser')
+        except (requests.RequestException, TypeError) as error:
+            raise LoginError('Guest login to {} failed: {}'.format(self.base_url, error)) from error
+
+        if len(soup.find_all(string='You are logged on as a Guest.')) == 0:
+            raise LoginError('Spin did not confirm the guest login')
+
+        s.viewstate = login_payload['__VIEWSTATE']
+        metrics.count('http.logins')
+        with self.lock:
+            self.logins += 1
+        self.save(s)
+        return s
+
+
+    def send(self, session, method, url, **kwargs):
+        """
+        Every request to Spin goes through here, paced by the limiter and reported back
+        to it with its latency. Raises for HTTP errors.
+        """
+        page = url.split('?')[0].rstrip('/').rsplit('/', 1)[-1].lower()
+        if self.limiter:
+            self.limiter.acquire()
+        metrics.count('http.requests')
+        start = monotonic()
+        try:
+            with metrics.span('http.' + page):
+                r = session.request(method, url, **kwargs)
+            r.raise_for_status()
+        except requests.RequestException:
+            metrics.count('http.errors')
+            if self.limiter:
+                self.limiter.feedback(False)
+            raise
+        metrics.count('http.bytes', len(r.content))
+        if self.limiter:
+            self.limiter.feedback(True, monotonic() - start)
+        return r
+
+
+    def expired(self, response):
+        """Whether Spin answered with its logon page rather than the page asked for"""
+        return 'logon.aspx' in response.url.lower() or b'uctrlLogon' in response.content
+
+
+    def get(self, url, **kwargs):
+        """
+        GET a Spin page on a pooled session, logging in again and retrying if the
+        session turns out to have expired. Raises for HTTP errors and LoginError.
+        """
+        session = self.idle.get()
+        try:
+            for attempt in range(self.attempts):
+                if session is None:
+                    session = self.login()
+                r = self.send(session, 'GET', url, **kwargs)
+                if not self.expired(r):
+                    return r
+                metrics.count('http.retries')
+                session = None
+            raise LoginError('Spin session expired again straight after logging in')
+        finally:
+            self.idle.put(session)
+
+
+class Spin:
+    """
+    Interface with land titles. Will return a 'dataframe' attribute with titles. A cell
+    whose search fails is searched again up to attempts times, waiting backoff seconds
+    and then twice as long each time; cells that still fail are listed in failed.
+    """
+    def __init__(self, grid=False, pull_period=False, journal=False, workers=1, rate=0.5, cache=None,
+                 progress=None, store=None, base_url=SPIN_URL, limiter=None, sessions=None, blobs=None,
+                 format='parquet', attempts=3, backoff=2.0):
+        self.runtime = progress.runtime if progress else time()
+        self.base_url = base_url.rstrip('/')
+        self.format = format
+        self.workers = workers
+        self.cache = cache
+        self.progress = progress
+        self.store = store
+        self.limiter = limiter if limiter else RateController(rate)
+        self.sessions = sessions if sessions else SessionPool(self.base_url, size=workers, limiter=self.limiter)
+        self.blobs = blobs if blobs else BlobStore()
+        self.builder = JournalBuilder()
+        self.listener = None
+        self.searched = []
+        self.failed = []
+        self.incomplete = []
+        self.attempts = attempts
+        self.backoff = backoff
+
+        if journal:
+            self.journal = read_frame(journal)
+            if pull_period:
+                self.pull(pull_period)
+        else:
+            if grid:
+                self.fetch(grid)
+                self.bundle()
+                if pull_period:
+                    self.pull(pull_period)
 
-            if len(soup.find_all(text='You are logged on as a Guest.')) > 0:
-                return s
+        return None
 
 
+    @metrics.timed('stage.fetch')
     def fetch(self, grid):
         """
         Performs the grid searching and builds a journal dataframe with the full list of
         titles to filter and pull.
         """
-        with self.session as s:
-            # Recursively handle either a grid or a single bound
-            if type(grid[0]) is list:
-                with click.progressbar(grid, label='Fetching journal') as g:
-                    for bound in g:
-                        self.fetch(bound)
-            elif type(grid[0]) is tuple:
-                # Construct the web request from the coordinates
-                poly = ''.join(['{};{};'.format(point[0], point[1]) for point in grid])
-                payload = {
-                    'qt': 'spatial',
-                    'pts': poly,
-                    'rad': 0,
-                    'rights': 'B'
-                }
-                url = 'https://alta.registries.gov.ab.ca/SpinII/SearchTitlePrint.aspx'
-
-                sleep(3)
-                r = s.get(url, params=payload)
-                soup = BeautifulSoup(r.content, 'html.parser')
-
-                # Extract the table and load into a DataFrame
-                try:
-                    table = soup.find('table', class_='bodyText')
-                    df = pd.read_html(str(table), index_col=0, header=0, parse_dates=False)[0]
-                    df['Registration Date'] = pd.to_datetime(df['Registration Date'], format='%d/%m/%Y')
-                    df['Change/Cancel Date'] = pd.to_datetime(df['Change/Cancel Date'], format='%d/%m/%Y')
+        # Walk an adaptive plan, or search either a grid or a single bound
+        if isinstance(grid, Quadtree):
+            self.walk(grid)
+        elif type(grid[0]) is list:
+            with click.progressbar(length=len(grid), label='Fetching journal') as bar, \
+                    ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for polygon, df in zip(grid, executor.map(self.visit, grid)):
+                    self.record(polygon, df)
+                    if df is not None and len(df) > 0:
+                        self.collect(df)
+                    bar.update(1)
+        elif type(grid[0]) is tuple:
+            df = self.visit(grid)
+            self.record(grid, df)
+            if df is not None and len(df) > 0:
+                self.collect(df)
+
+        if self.failed or self.incomplete:
+            click.echo('{} cells failed to search and {} were still truncated at the minimum size; '
+                       'resume the run to search failed cells again'.format(len(self.failed), len(self.incomplete)),
+                       err=True)
+
+
+    def walk(self, tree):
+        """
+        Searches an adaptive Quadtree plan, keeping up to two cells per worker in flight
+        and queueing the quadrants of any cell that comes back truncated.
+        """
+        pending = {}
+        with click.progressbar(length=len(tree), label='Fetching journal') as bar, \
+                ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while len(tree) > 0 or len(pending) > 0:
+                while len(tree) > 0 and len(pending) < self.workers * 2:
+                    polygon = tree.pop()
+                    pending[executor.submit(self.visit, polygon)] = polygon
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    polygon = pending.pop(future)
+                    df = future.result()
+                    bar.update(1)
+                    if tree.truncated(df):
+                        children = tree.divide(polygon)
+                        if len(children) > 0:
+                            self.record(polygon, df, divided=True)
+                            bar.length += len(children)
+                            continue
+                        self.incomplete.append(polygon)
+                        metrics.count('spin.incomplete')
+                    self.record(polygon, df)
+                    if df is not None and len(df) > 0:
+                        self.collect(df)
+
+
+    def collect(self, df):
+        """Add a quadrant table to the journal, handing its new titles to any listener"""
+        added = self.builder.add(df)
+        if self.listener and added:
+            self.listener(added)
+
+
+    def visit(self, polygon):
+        """
+        Search a cell, reusing its result if an earlier attempt of this run finished it,
+        and retrying it with backoff if the search fails
+        """
+        if self.progress:
+            found, df = self.progress.cell(polygon)
+            if found:
+                return df
+        for attempt in range(self.attempts):
+            if attempt:
+                metrics.count('spin.retries')
+                sleep(self.backoff * 2 ** (attempt - 1))
+            df = self.search(polygon)
+            if df is not None:
+                return df
+        self.failed.append(polygon)
+        metrics.count('spin.failed')
+        return None
 
-                    self.data.append(df)
-                except:
-                    pass
+
+    def record(self, polygon, df, divided=False):
+        """
+        Checkpoint a finished cell. Failed searches are left out so they are retried on
+        resume, unless they were divided, in which case their quadrants carry on. Cells
+        searched in full are listed in searched.
+        """
+        if self.progress and (df is not None or divided):
+            self.progress.record_cell(polygon, df)
+        if df is not None and not divided:
+            self.searched.append(polygon)
+
+
+    def search(self, polygon):
+        """
+        Runs a spatial search on a single polygon. Returns the title table, which is
+        empty when the quadrant holds no titles and Spin sends only the table's header
+        row, or None if Spin failed the request or answered with any other page, such as
+        an error or logon page.
+        """
+        # Construct the web request from the coordinates
+        poly = ''.join(['{};{};'.format(point[0], point[1]) for point in polygon])
+        payload = {
+            'qt': 'spatial',
+            'pts': poly,
+            'rad': 0,
+            'rights': 'B'
+        }
+        url = self.base_url + '/SearchTitlePrint.aspx'
+
+        content = self.cache.get(url, payload, self.cache.search_ttl) if self.cache else None
+        cached = content is not None
+        if not cached:
+            try:
+                r = self.sessions.get(url, params=payload)
+            except (requests.RequestException, LoginError):
+                return None
+            content = r.content
+        with metrics.span('spin.parse_search'):
+            soup = BeautifulSoup(content, 'html.parser')
+            table = soup.find('table', class_='bodyText')
+        if table is None:
+            metrics.count('spin.unrecognised')
+            if not cached:
+                self.limiter.feedback(False)
+            return None
+
+        # Load the table into a DataFrame
+        try:
+            with metrics.span('spin.read_html'):
+                df = pd.read_html(StringIO(str(table)), index_col=0, header=0, parse_dates=False)[0]
+            df['Registration Date'] = pd.to_datetime(df['Registration Date'], format='%d/%m/%Y')
+            df['Change/Cancel Date'] = pd.to_datetime(df['Change/Cancel Date'], format='%d/%m/%Y')
+        except (ValueError, KeyError):
+            if not cached:
+                self.limiter.feedback(False)
+            return None
+
+        if self.cache and not cached:
+            self.cache.put(url, payload, content)
+        return df
 
 
     def bundle(self):
         """
-        Bundles a list of DataFrames into one and sorts by registration date
+        Collects the deduplicated journal built during fetch and sorts by registration date
         """
-        if len(self.data) > 0:
-            self.journal = self.data[0].append(self.data[1:])
-        self.journal = self.journal[self.journal['Type'] == 'Current Title']
-        self.journal = self.journal[self.journal['Rights'] != 'Mineral']
-        self.journal = self.journal[~self.journal.index.duplicated(keep='first')]
+        self.journal = self.builder.frame()
         self.journal = self.journal.sort_values(by=['Registration Date'], ascending=False)
         return self.journal
 
 
+    @metrics.timed('stage.pull')
     def pull(self, period):
         """
         Takes the journal dataframe and coordinates the retrieval and parsing of individual
         tiles.
         """
-        # Compile the regex expressions we'll use to parse the title text
-        self.identity_regex = re.compile(r"(\d{4} \d{3} \d{3})\s{2,}(\S+)\s{2,}(\d{3} \d{3} \d{3} *\S*)")
-        self.ats_regex = re.compile(r"ATS REFERENCE: (\S*)")
-        self.municipality_regex = re.compile(r"MUNICIPALITY: (.*)")
-        self.reference_regex = re.compile(r"REFERENCE NUMBER: (.*?)\-{80}", re.DOTALL)
-        self.payday_regex = re.compile(r"(\-{80}).*(\-{80})(.*)", re.DOTALL)
-
         # Filter the dataframe by date and retrieve each title
         df = self.journal
         df = df[df['Registration Date'] >= period]
 
-        df.to_pickle('run/{}.journal.pkl'.format(self.runtime))
+        write_frame(df, artifact(self.runtime, 'journal', self.format))
 
         click.echo('Journal constructed and saved with timestamp {}'.format(self.runtime))
 
-        # Set up structure for target DataFrame
-        self.dataframe = pd.DataFrame(
-            columns=[
-                'linc',
-                'short_legal',
-                'title_number',
-                'ats_reference',
-                'municipality',
-                'registration',
-                'registration_date',
-                'document_type',
-                'sworn_value',
-                'consideration',
-                'condo'
-            ], index=df.index
-        )
-
-        with click.progressbar(df.iterrows(), label='Pulling basic title data', length=len(df)) as d:
-            for index, row in d:
-                try:
-                    payload = self.retrieve_title(index)
-                    self.dataframe.loc[index, 'linc'] = payload['linc']
-                    self.dataframe.loc[index, 'short_legal'] = payload['short_legal']
-                    self.dataframe.loc[index, 'title_number'] = payload['title_number']
-                    self.dataframe.loc[index, 'ats_reference'] = payload['ats_reference']
-                    self.dataframe.loc[index, 'municipality'] = payload['municipality']
-                    self.dataframe.loc[index, 'registration'] = payload['registration']
-                    self.dataframe.loc[index, 'registration_date'] = payload['date']
-                    self.dataframe.loc[index, 'document_type'] = payload['document_type']
-                    self.dataframe.loc[index, 'sworn_value'] = payload['value']
-                    self.dataframe.loc[index, 'consideration'] = payload['consideration']
-                    self.dataframe.loc[index, 'condo'] = payload['condo']
-                except TypeError:
-                    pass
-
-        self.dataframe['registration_date'] = pd.to_datetime(self.dataframe['registration_date'])
-        self.dataframe['sworn_value'] = self.dataframe['sworn_value'].astype(float)
-        self.dataframe['consideration'] = self.dataframe['consideration'].astype(float)
-        self.dataframe['condo'] = self.dataframe['condo'].fillna(False).astype(bool)
-
-        self.dataframe.to_pickle('run/{}.dataframe.pkl'.format(self.runtime))
+        # Titles parsed in an earlier attempt of this run, or unchanged since the last run
+        # of this locality, are not retrieved again
+        payloads = self.progress.titles() if self.progress else {}
+        if self.store:
+            unchanged = self.store.payloads(df['Registration Date'])
+            click.echo('{} of {} titles unchanged since the last run'.format(len(unchanged), len(df)))
+            payloads.update(unchanged)
+        todo = [index for index in df.index if str(index) not in payloads]
+        registered = [str(df.loc[index, 'Registration Date']) for index in todo]
+        with click.progressbar(length=len(todo), label='Pulling basic title data') as bar, \
+                ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for index, payload in zip(todo, executor.map(self.retrieve_title, todo, registered)):
+                bar.update(1)
+                if payload is not None:
+                    payloads[str(index)] = payload
+                    if self.progress:
+                        self.progress.record_title(index, payload)
+
+        if self.store:
+            self.store.record_titles(df['Registration Date'], payloads)
+
+        with metrics.span('spin.assemble'):
+            self.dataframe = assemble(df.index, payloads)
+
+        write_frame(self.dataframe, artifact(self.runtime, 'dataframe', self.format))
         click.echo('Dataframe constructed and saved with timestamp {}'.format(self.runtime))
 
         return self.dataframe
 
 
-    def retrieve_title(self, index):
+    def retrieve_title(self, index, registered=None):
         """
-        Called within pull() on  an individual title number
+        Called within pull() on  an individual title number. The registration date keys
+        the cached copy, so a title is only fetched again once its registration changes.
+        Returns None if the title could not be retrieved, leaving it for a later attempt.
         """
-        with self.session as s:
-            article_url = (
-                'https://alta.registries.gov.ab.ca/SpinII'
-                '/ImmediateCheckoutPreviewHTML.aspx'
-                '?ArticleTypeID=f1fdd406-26aa-45d5-9bf9-3f552c972a5c'
-                '&ArticleType=CurrentTitle'
-                '&ArticleID=%s&NextPage=' % index
-            )
-            sleep(2)
-            article = s.get(article_url)
-            soup = BeautifulSoup(article.content, 'html.parser')
-            if soup.pre:
+        article_url = (
+            self.base_url +
+            '/ImmediateCheckoutPreviewHTML.aspx'
+            '?ArticleTypeID=f1fdd406-26aa-45d5-9bf9-3f552c972a5c'
+            '&ArticleType=CurrentTitle'
+            '&ArticleID=%s&NextPage=' % index
+        )
+        key = {'registered': registered}
+        content = self.cache.get(article_url, key, self.cache.title_ttl) if self.cache else None
+        cached = content is not None
+        if not cached:
+            try:
+                content = self.sessions.get(article_url).content
+            except (requests.RequestException, LoginError):
+                return None
+        with metrics.span('spin.parse_title'):
+            soup = BeautifulSoup(content, 'html.parser')
+            if not soup.pre:
+                return None
+            try:
                 payload = self.parse_title(soup.pre)
-                with open('data/titles/{}.txt'.format(index), "w") as f:
-                    f.write(payload['title_text'])
-                return payload
+            except ValueError:
+                payload = None
+        if payload is None:
+            if not cached:
+                self.limiter.feedback(False)
+            return None
+
+        if self.cache and not cached:
+            self.cache.put(article_url, key, content)
+        self.blobs.put('title', normalize_title(index), payload['title_text'].encode('utf-8'), 'txt', compress=True)
+        return payload
 
 
     def parse_title(self, pre):
         """
-        Takes raw title information and parses it with regex to normalize the data.
+        Takes raw title information and parses it into a payload dict; see titles.parse.
         """
-        # Extract datapoints
-        title_text = str(pre)
-        title = {}
+        return titles.parse(str(pre))._asdict()
 
-        identity_data = self.identity_regex.search(title_text)
-        title['linc'] = int(identity_data.group(1).strip().replace(' ', ''))
-        title['short_legal'] = identity_data.group(2).strip().replace(';', ' ')
-        title['title_number'] = identity_data.group(3).strip()
 
-        try:
-            title['ats_reference'] = self.ats_regex.search(title_text).group(1).replace(';',' ')
-        except AttributeError:
-            title['ats_reference'] = ''
+Parcel = namedtuple('Parcel', 'linc easting northing lng lat site digest fetched')
 
-        title['municipality'] = self.municipality_regex.search(title_text).group(1).replace('\r','')
 
-        try:
-            references = self.reference_regex.search(title_text).group(1).split("\n")
-            references = [i.strip() for i in references]
-            references = list(filter(None, references))
-            title['reference_number'] = references
-        except AttributeError:
-            title['reference_number'] = ['']
-
-        payday_raw = self.payday_regex.search(title_text).group(3).strip('</pre>').strip()
-        title['registration'] = payday_raw[:11]
-        title['date'] = reversed(payday_raw[15:25].split('/'))
-        title['date'] = '-'.join(title['date'])
-        title['document_type'] = payday_raw[27:46].strip()
-
-        title['value'] = self._try_int(payday_raw[46:62].strip())
-        title['consideration'] = self._try_int(payday_raw[62:80].strip())
-
-        if "CONDOMINIUM" in title_text:
-            title['condo'] = True
-        else:
-            title['condo'] = False
+class ParcelCache:
+    """
+    Persistent LINC to location and site plan cache, so a parcel mapped in any earlier
+    run is never sent to the browser again. Entries older than max_age are refreshed,
+    entries whose site plan is missing from the blob store are remapped, and the least
+    recently used entries are evicted past max_entries.
+    """
+    def __init__(self, path='data/parcels.db', max_age=365 * 24 * 3600, max_entries=None, blobs=None):
+        self.path = path
+        self.blobs = blobs
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.lock = Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS parcels (linc INTEGER PRIMARY KEY, easting REAL, northing REAL, '
+            'lng REAL, lat REAL, site TEXT, digest TEXT, fetched REAL, accessed REAL)'
+        )
 
-        title['title_text'] = title_text.strip('<pre>').strip('</pre>').strip()
+        return None
 
-        return title
 
+    def execute(self, sql, parameters=()):
+        with self.lock:
+            return self.db.execute(sql, parameters).fetchall()
 
-    def _try_int(self, string):
-        """Try to convert a string to integer; return None if non-numeric"""
-        value = re.sub(r"[^0-9]+", '', string)
-        try:
-            value = int(value)
-        except ValueError:
-            value = None
-        return value
 
+    def lookup(self, lincs):
+        """Fresh cached Parcels for the given LINCs, keyed by LINC"""
+        found = {}
+        now = time()
+        lincs = list(lincs)
+        for i in range(0, len(lincs), 500):
+            chunk = lincs[i:i + 500]
+            rows = self.execute(
+                'SELECT linc, easting, northing, lng, lat, site, digest, fetched FROM parcels '
+                'WHERE linc IN ({})'.format(','.join('?' * len(chunk))), chunk
+            )
+            for row in rows:
+                parcel = Parcel(*row)
+                if self.max_age is not None and now - parcel.fetched > self.max_age:
+                    continue
+                if parcel.site and self.blobs and not (parcel.digest and self.blobs.contains(parcel.digest)):
+                    continue
+                found[parcel.linc] = parcel
+        with self.lock:
+            self.db.executemany('UPDATE parcels SET accessed = ? WHERE linc = ?', [(now, linc) for linc in found])
+        return found
 
-class Spatial:
+
+    def record(self, parcel):
+        self.execute('INSERT OR REPLACE INTO parcels VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                     tuple(parcel) + (parcel.fetched,))
+        if self.max_entries is not None:
+            self.evict(self.max_entries)
+
+
+    def evict(self, keep):
+        """Drop all but the most recently used entries"""
+        self.execute('DELETE FROM parcels WHERE linc NOT IN '
+                     '(SELECT linc FROM parcels ORDER BY accessed DESC LIMIT ?)', (keep,))
+
+
+    def prune(self, max_age=None):
+        """Drop entries fetched longer than max_age seconds ago, returning how many went"""
+        max_age = self.max_age if max_age is None else max_age
+        count = self.execute('SELECT COUNT(*) FROM parcels WHERE fetched < ?', (time() - max_age,))[0][0]
+        self.execute('DELETE FROM parcels WHERE fetched < ?', (time() - max_age,))
+        return count
+
+
+    def stats(self):
+        count, oldest, newest = self.execute('SELECT COUNT(*), MIN(fetched), MAX(fetched) FROM parcels')[0]
+        return dict(count=count, oldest=oldest, newest=newest)
+
+
+# Pillow format, file extension and save options for each site plan encoding
+SITE_FORMATS = {
+    'png': ('PNG', 'png', {}),
+    'optimized-png': ('PNG', 'png', {'optimize': True}),
+    'webp': ('WEBP', 'webp', {'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'optimize': True}),
+}
+
+
+def site_name(linc):
+    """Name a LINC's site plan is stored under: the LINC zero padded to ten digits"""
+    return str(int(linc)).zfill(10)
+
+
+class SitePlanEncoder:
     """
-    Enhanced data sourcing which obtains coordinates for each transaction and a screenshot
-    site plan
+    Crops, optionally downscales and encodes site plan screenshots in memory on a
+    background pool, so browsers go straight on to their next LINC, and adds them to the
+    blob store. Optimized PNGs are reduced to a 256 colour palette, which map tiles
+    survive without visible loss.
     """
-    def __init__(self, dataframe=False):
-        self.runtime = time()
-        self.spatial_count = 0
+    def __init__(self, blobs=None, format='png', quality=80, scale=1.0, workers=2):
+        if format not in SITE_FORMATS:
+            raise ValueError('Site plan format must be one of {}'.format(', '.join(SITE_FORMATS)))
+        self.blobs = blobs if blobs else BlobStore()
+        self.format = format
+        self.quality = quality
+        self.scale = scale
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+        return None
+
+
+    def filename(self, linc):
+        return '{}.{}'.format(site_name(linc), SITE_FORMATS[self.format][1])
+
+
+    def submit(self, linc, png, box):
+        """Queue a screenshot for encoding, returning a future of the saved file's digest"""
+        return self.executor.submit(self.encode, linc, png, box)
+
+
+    @metrics.timed('site.encode')
+    def encode(self, linc, png, box):
+        """Crop, scale and encode a PNG screenshot, store it and return its SHA-256 digest"""
+        image = Image.open(BytesIO(png)).crop(box)
+        if self.scale != 1:
+            size = (max(1, round(image.width * self.scale)), max(1, round(image.height * self.scale)))
+            image = image.resize(size, Image.LANCZOS)
+
+        kind, _, options = SITE_FORMATS[self.format]
+        if self.format == 'optimized-png':
+            image = image.convert('RGB').quantize(256)
+        elif kind in ('JPEG', 'WEBP'):
+            image = image.convert('RGB')
+            options = dict(options, quality=self.quality)
+
+        buffer = BytesIO()
+        image.save(buffer, kind, **options)
+        metrics.count('site.bytes', buffer.tell())
+        return self.blobs.put('site', site_name(linc), buffer.getvalue(), SITE_FORMATS[self.format][1])
+
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        return None
+
+
+class Browser:
+    """
+    A headless Chrome logged in to Spin's map search as a guest. Every step waits on the
+    page elements it needs rather than sleeping for a fixed time. The future of the last
+    site plan handed to the encoder is kept in encoding.
+    """
+    # The map image Spin renders for each search, with the searched parcel at its centre
+    MAP_IMAGE = (By.CSS_SELECTOR, '#map img')
+
+    def __init__(self, base_url=SPIN_URL, timeout=60, encoder=None):
+        self.base_url = base_url.rstrip('/')
+        self.encoder = encoder or SitePlanEncoder(workers=1)
+        self.encoding = None
+        self.timeout = timeout
+        self.coordinates = None
+
         chrome_options = Options()
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--window-size=1200,800")
+        with metrics.span('browser.launch'):
+            self.driver = webdriver.Chrome(options=chrome_options)
 
-        self.driver = webdriver.Chrome(chrome_options=chrome_options)
-
-        self.driver.get('https://alta.registries.gov.ab.ca/spinii/logon.aspx')
-        sleep(1)
-        self.driver.find_element_by_id('uctrlLogon_cmdLogonGuest').click()
-        sleep(1)
-        self.driver.find_element_by_id('cmdYES').click()
-        sleep(1)
-        self.driver.get('http://alta.registries.gov.ab.ca/SpinII/mapindex.aspx')
-
-        if len(dataframe) > 0:
-            geoseries = self.build_geoseries(dataframe)
-            self.geodataframe = gpd.GeoDataFrame(dataframe, geometry=geoseries)
-            self.geodataframe.to_pickle('run/{}.geodataframe.pkl'.format(self.runtime))
-            click.echo('Geodataframe constructed and saved with timestamp {}'.format(self.runtime))
+        try:
+            with metrics.span('browser.login'):
+                self.driver.get(self.base_url + '/logon.aspx')
+                self.wait(EC.element_to_be_clickable((By.ID, 'uctrlLogon_cmdLogonGuest'))).click()
+                confirm = self.wait(EC.element_to_be_clickable((By.ID, 'cmdYES')))
+                confirm.click()
+                self.wait(EC.staleness_of(confirm))
+                self.driver.get(self.base_url + '/mapindex.aspx')
+        except Exception:
             self.close()
+            raise
 
         return None
 
-    def build_geoseries(self, dataframe):
-        """Runs map_property on a list of lincs and returns the geoseries"""
-        geo_list = []
-        with click.progressbar(dataframe.iterrows(), label='Pulling site plans and geographic title data', length=len(dataframe)) as d:
-            for index, row in d:
-                geo_list.append(self.map_property(row['linc']))
 
-        geo_series = gpd.GeoSeries([Point(mark) for mark in geo_list], index=dataframe.index)
+    def wait(self, condition, timeout=None):
+        return WebDriverWait(self.driver, timeout or self.timeout).until(condition)
 
-        return geo_series
 
+    def rendered(self, driver):
+        """The map's images once every one of them has finished loading, else False"""
+        images = driver.find_elements(*self.MAP_IMAGE)
+        if not images or not driver.execute_script('return arguments[0].every(i => i.complete)', images):
+            return False
+        return images
 
 
     def map_property(self, linc):
-        """Map search a linc"""
-        sleep(1)
+        """
+        Map search a linc and return its Parcel, queueing its site plan for encoding. The
+        map images on screen before the search are kept, and the map only counts as
+        showing the parcel once they have been replaced and the new ones have loaded, so
+        neither the first LINC nor one at the same spot as the last is read off a map
+        that has not yet redrawn.
+        """
+        number = int(linc)
         linc = '{}'.format(linc).zfill(10)
-        self.driver.switch_to_frame('fOpts')
-        select_box = Select(self.driver.find_element_by_id('Finds_lstFindTypes'))
-        select_box.select_by_visible_text('Linc Number')
-        linc_box = self.driver.find_element_by_id('Finds_ctlLincNumber_txtLincNumber')
-        linc_box.clear()
-        linc_box.send_keys(linc)
-        self.driver.find_element_by_id('Finds_cmdSubmit').click()
-        if self.spatial_count == 0:
-                sleep(8)
-        sleep(4)
-        self.driver.switch_to_default_content()
-        if self.spatial_count == 0:
-            try:
-                e = WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.ID, 'map'))
-                )
-            except:
-                self.driver.refresh()
-                self.driver.switch_to_default_content()
-        e = WebDriverWait(self.driver, 60).until(
-                EC.presence_of_element_located((By.ID, 'map'))
-        )
-        hover_target = self.driver.find_element_by_id('map')
-        if self.spatial_count == 0:
-            sleep(5)
+        before = self.driver.find_elements(*self.MAP_IMAGE)
+        with metrics.span('browser.search', linc=linc):
+            self.wait(EC.frame_to_be_available_and_switch_to_it('fOpts'))
+            select_box = Select(self.wait(EC.presence_of_element_located((By.ID, 'Finds_lstFindTypes'))))
+            select_box.select_by_visible_text('Linc Number')
+            linc_box = self.wait(EC.visibility_of_element_located((By.ID, 'Finds_ctlLincNumber_txtLincNumber')))
+            linc_box.clear()
+            linc_box.send_keys(linc)
+            self.driver.find_element(By.ID, 'Finds_cmdSubmit').click()
+            self.driver.switch_to.default_content()
+
+        with metrics.span('browser.render', linc=linc):
+            if before:
+                self.wait(EC.staleness_of(before[0]))
+            self.wait(self.rendered)
+
+        # Nudge the redrawn map so it reports its centre
+        hover_target = self.wait(EC.visibility_of_element_located((By.ID, 'map')))
+
+        def centre(driver):
+            ActionChains(driver).move_to_element(hover_target).drag_and_drop_by_offset(hover_target, 1, 1).perform()
+            text = driver.find_element(By.ID, 'coordinateOutput').text
+            reading = tuple(float(v) for v in re.findall(r"-?[0-9]+\.?[0-9]*", text))[:2]
+            return reading if len(reading) == 2 else False
+
+        with metrics.span('browser.locate', linc=linc):
+            self.coordinates = self.wait(centre)
+
         map_location = hover_target.location
         map_size = hover_target.size
-        filename = 'data/sites/{}.png'.format(linc)
-        self.driver.save_screenshot(filename)
+        with metrics.span('browser.screenshot', linc=linc):
+            png = self.driver.get_screenshot_as_png()
         x = map_location['x'] + 50
         y = map_location['y']
         width = map_location['x'] + map_size['width'] - 50
         height = map_location['y'] + map_size['height']
-        im = Image.open(filename)
-        im = im.crop((int(x), int(y), int(width), int(height)))
-        im.save(filename)
-        if self.spatial_count == 0:
-            sleep(5)
-        ActionChains(self.driver).move_to_element(hover_target).drag_and_drop_by_offset(hover_target, 1, 1).perform()
-        if self.spatial_count == 0:
-            sleep(5)
-        nad83_raw = self.driver.find_element_by_id('coordinateOutput').text
-        nad83 = tuple(re.findall(r"[0-9\.\-]+", nad83_raw))
-        gps = Geography().nad83(nad83, reverse=True)
-        gpsr = (gps[1], gps[0])
-        self.spatial_count += 1
-        return gpsr
+        self.encoding = self.encoder.submit(number, png, (int(x), int(y), int(width), int(height)))
+
+        gps = PROJECTION.inverse_points(self.coordinates)[0]
+        easting, northing = self.coordinates
+        return Parcel(number, easting, northing, float(gps[1]), float(gps[0]), self.encoder.filename(number), None,
+                      time())
 
 
     def close(self):
-        self.driver.quit()
+        try:
+            self.driver.quit()
+        except WebDriverException:
+            pass
+        return None
+
+
+class Spatial:
+    """
+    Enhanced data sourcing which obtains coordinates for each transaction. LINCs are
+    located offline from their ATS reference where it resolves, and otherwise, or when
+    site plans are wanted, mapped by a pool of browsers sharing one rate limiter; a
+    browser that dies is replaced and its LINC retried. A map search takes far longer
+    than an HTTP request, so the browsers want a limiter of their own rather than the
+    one pacing Spin's searches and titles.
+    """
+    def __init__(self, dataframe=False, progress=None, store=None, browsers=1, limiter=None, attempts=2,
+                 base_url=SPIN_URL, parcels=None, site_plans=False, split_plans=(), encoder=None, format='parquet'):
+        self.runtime = progress.runtime if progress else time()
+        self.encoder = encoder or SitePlanEncoder()
+        self.format = format
+        self.split_plans = set(split_plans)
+        self.base_url = base_url
+        self.parcels = parcels
+        self.site_plans = site_plans
+        self.progress = progress
+        self.store = store
+        self.browsers = browsers
+        self.limiter = limiter
+        self.attempts = attempts
+
+        if len(dataframe) > 0:
+            geoseries = self.build_geoseries(dataframe)
+            self.geodataframe = gpd.GeoDataFrame(dataframe, geometry=geoseries, crs='EPSG:4326')
+            write_frame(self.geodataframe, artifact(self.runtime, 'geodataframe', self.format))
+            click.echo('Geodataframe constructed and saved with timestamp {}'.format(self.runtime))
+
+        return None
+
+    @metrics.timed('stage.map')
+    def build_geoseries(self, dataframe):
+        """
+        Maps every LINC in the dataframe and returns the geoseries in dataframe order.
+        Condominium units are mapped once per plan and share its point and site plan.
+        LINCs mapped in an earlier attempt of this run, in an earlier run of the locality,
+        or held in the parcel cache are reused; LINCs that cannot be mapped get an empty
+        point.
+        """
+        sites = self.store.sites() if self.store else {}
+        if self.progress:
+            sites.update(self.progress.sites())
+
+        lincs = [None if pd.isna(linc) else int(linc) for linc in dataframe['linc']]
+        units = self.plans(dataframe)
+        # A unit missing from sites is queued as its plan's representative, unless that was mapped already
+        todo = [units.get(linc, linc) for linc in lincs if linc is not None and linc not in sites]
+        todo = list(dict.fromkeys(linc for linc in todo if linc not in sites))
+
+        if self.parcels:
+            cached = self.parcels.lookup(todo)
+            metrics.count('parcels.hit', len(cached))
+            metrics.count('parcels.miss', len(todo) - len(cached))
+            sites.update({linc: (parcel.lng, parcel.lat) for linc, parcel in cached.items()})
+            todo = [linc for linc in todo if linc not in cached]
+
+        if not self.site_plans:
+            located = self.locate(dataframe, todo)
+            sites.update(located)
+            todo = [linc for linc in todo if linc not in located]
+
+        for linc, parcel in self.map_lincs(todo).items():
+            sites[linc] = (parcel.lng, parcel.lat)
+
+        for unit, linc in units.items():
+            if unit not in sites and linc in sites:
+                sites[unit] = sites[linc]
+                self.share_site_plan(linc, unit)
+                if self.progress:
+                    self.progress.record_site(unit, sites[unit])
+
+        if self.store:
+            self.store.record_sites(sites)
+
+        geo_series = gpd.GeoSeries([Point(sites[linc]) if linc in sites else Point() for linc in lincs],
+                                   index=dataframe.index)
+
+        return geo_series
+
+
+    def plans(self, dataframe):
+        """
+        The LINC standing in for each condominium unit on its plan, taken from the plan
+        number leading the short legal. Plans in split_plans span several buildings and
+        keep one lookup per unit.
+        """
+        if 'condo' not in dataframe or 'short_legal' not in dataframe:
+            return {}
+        condos = dataframe.loc[dataframe['condo'].fillna(False).astype(bool) & dataframe['linc'].notna(),
+                               ['linc', 'short_legal']]
+        plan = condos['short_legal'].fillna('').str.split().str[0]
+        condos = condos[plan.notna() & ~plan.isin(self.split_plans)]
+        first = condos.groupby(plan)['linc'].transform('first')
+        return {int(unit): int(linc) for unit, linc in zip(condos['linc'], first) if unit != linc}
+
+
+    def share_site_plan(self, linc, unit):
+        """Point one of a plan's units at the plan's site plan, if it was captured"""
+        blobs = self.encoder.blobs
+        if blobs.entry('site', site_name(unit)) is None:
+            blobs.link('site', site_name(unit), site_name(linc))
+
+
+    def locate(self, dataframe, lincs):
+        """
+        Quarter section centroids of the given LINCs from their ATS references, for
+        those with a reference that resolves.
+        """
+        if 'ats_reference' not in dataframe or not lincs:
+            return {}
+        frame = dataframe.loc[dataframe['ats_reference'].fillna('') != '', ['linc', 'ats_reference']]
+        frame = frame[frame['linc'].isin(lincs)].drop_duplicates('linc')
+        with metrics.span('spatial.ats_locate'):
+            points = ats.locate(frame['ats_reference'].to_numpy())
+
+        located = {}
+        for linc, (lng, lat) in zip(frame['linc'], points):
+            if not np.isnan(lng):
+                located[int(linc)] = (float(lng), float(lat))
+                if self.progress:
+                    self.progress.record_site(int(linc), located[int(linc)])
+
+        click.echo('{} of {} LINCs located from their ATS reference'.format(len(located), len(lincs)))
+        return located
+
+
+    def map_lincs(self, lincs):
+        """
+        Maps LINCs across the browser pool and returns Parcels for those that succeeded,
+        checkpointing each one as it arrives. Every site plan is encoded before Parcels go
+        into the parcel cache; one that fails to encode is reported and skipped.
+        """
+        tasks, results = Queue(), Queue()
+        for linc in lincs:
+            tasks.put(linc)
+        workers = [Thread(target=self.work, args=(tasks, results), daemon=True)
+                   for _ in range(min(self.browsers, len(lincs)))]
+        for worker in workers:
+            tasks.put(None)
+            worker.start()
+
+        mapped, encodings = {}, []
+        with click.progressbar(length=len(lincs), label='Pulling site plans and geographic title data') as bar:
+            for _ in lincs:
+                linc, parcel, encoding = results.get()
+                bar.update(1)
+                if parcel is not None:
+                    mapped[linc] = parcel
+                    if self.progress:
+                        self.progress.record_site(linc, (parcel.lng, parcel.lat))
+                    encodings.append((parcel, encoding))
+
+        for worker in workers:
+            worker.join()
+
+        for parcel in self.settle(encodings):
+            mapped[parcel.linc] = parcel
+
+        return mapped
+
+
+    def settle(self, encodings):
+        """
+        Wait for each (Parcel, encoding future) pair's site plan, record the Parcels with
+        their digests in the parcel cache and return them. A site plan that fails to
+        encode is counted and reported, and leaves its Parcel without a digest so the
+        parcel cache remaps it on next use.
+        """
+        parcels, failed = [], 0
+        for parcel, encoding in encodings:
+            if encoding is not None:
+                try:
+                    parcel = parcel._replace(digest=encoding.result())
+                except Exception as error:
+                    failed += 1
+                    metrics.count('site.errors')
+                    click.echo('Site plan for LINC {} failed to encode: {}'.format(parcel.linc, error), err=True)
+            if self.parcels:
+                self.parcels.record(parcel)
+            parcels.append(parcel)
+        if failed:
+            click.echo('{} of {} site plans failed to encode'.format(failed, len(encodings)), err=True)
+        return parcels
+
+
+    def work(self, tasks, results):
+        """
+        Browser worker: maps LINCs from the task queue until it takes a None, restarting
+        its browser whenever the driver fails. Chrome is only launched for the first LINC.
+        """
+        browser = None
+        while True:
+            linc = tasks.get()
+            if linc is None:
+                break
+
+            parcel, encoding = None, None
+            try:
+                for attempt in range(self.attempts):
+                    try:
+                        if browser is None:
+                            browser = Browser(self.base_url, encoder=self.encoder)
+                        if self.limiter:
+                            self.limiter.acquire()
+                        start = monotonic()
+                        with metrics.span('browser.map_property', linc=linc):
+                            parcel = browser.map_property(linc)
+                        encoding = browser.encoding
+                        metrics.count('browser.mapped')
+                        if self.limiter:
+                            self.limiter.feedback(True, monotonic() - start)
+                        break
+                    except WebDriverException:
+                        metrics.count('browser.errors')
+                        if self.limiter:
+                            self.limiter.feedback(False)
+                        if browser is not None:
+                            browser.close()
+                        browser = None
+            finally:
+                results.put((linc, parcel, encoding))
+
+        if browser is not None:
+            browser.close()
+
+class Pipeline:
+    """
+    Streaming alternative to running Spin and Spatial one after the other. Titles from
+    each quadrant that pass the date filter go straight to title retrieval, and every
+    retrieved title's LINC goes straight on to be located, so searches, title pulls
+    and browsers all work at once. Bounded queues between the stages hold back a stage
+    that gets ahead, and each title is appended to a GeoJSON sequence as soon as it
+    has a point.
+    """
+    def __init__(self, spin, spatial, period, condo=False, depth=1000):
+        self.spin = spin
+        self.spatial = spatial
+        self.period = pd.Timestamp(period)
+        self.condo = condo
+        self.titles = Queue(maxsize=depth)
+        self.lincs = Queue(maxsize=depth)
+        self.tasks = Queue(maxsize=depth)
+        self.results = Queue()
+        self.lock = Lock()
+
+        progress, store = spin.progress, spin.store
+        self.known = progress.titles() if progress else {}
+        self.sites = store.sites() if store else {}
+        if progress:
+            self.sites.update(progress.sites())
+        self.payloads = {}
+        self.waiting = {}
+        self.plans = {}
+        self.units = {}
+        self.mapped = []
+        self.output = 'run/{}.features.geojsonl'.format(spin.runtime)
+
         return None
 
 
+    def run(self, grid):
+        """Run every stage over a grid or Quadtree and return the Spatial with its geodataframe"""
+        workers = self.spin.workers
+        browsers = self.spatial.browsers
+        self.spin.listener = self.journal
+        threads = [Thread(target=self.fetch, args=(grid, workers), daemon=True)]
+        threads += [Thread(target=self.retrieve, daemon=True) for _ in range(workers)]
+        mapper = Thread(target=self.map, args=(workers, browsers), daemon=True)
+        pool = [Thread(target=self.spatial.work, args=(self.tasks, self.results), daemon=True)
+                for _ in range(browsers)]
+        collector = Thread(target=self.collect, daemon=True)
+        with metrics.span('stage.pipeline'):
+            for thread in threads + [mapper] + pool + [collector]:
+                thread.start()
+
+            for thread in threads + [mapper] + pool:
+                thread.join()
+            self.results.put(None)
+            collector.join()
+
+            return self.finish()
+
+
+    def fetch(self, grid, workers):
+        """Search stage; tells each retriever to stop once the grid is done"""
+        try:
+            self.spin.fetch(grid)
+        finally:
+            for _ in range(workers):
+                self.titles.put(None)
+
+
+    def journal(self, added):
+        """Pass titles new to the journal and inside the period on to retrieval"""
+        position = self.spin.builder.columns.index('Registration Date')
+        for index, row in added:
+            if row[position] >= self.period:
+                self.titles.put((index, row[position]))
+
+
+    def retrieve(self):
+        """Title stage; reuses titles pulled earlier in this run or unchanged since the last"""
+        progress, store = self.spin.progress, self.spin.store
+        while True:
+            item = self.titles.get()
+            if item is None:
+                self.lincs.put(None)
+                return
+            index, registered = item
+            payload = self.known.get(str(index))
+            if payload is None and store:
+                payload = store.payload(index, registered)
+            if payload is None:
+                payload = self.spin.retrieve_title(index, str(registered))
+                if payload is not None and progress:
+                    progress.record_title(index, payload)
+            if payload is None:
+                continue
+            self.payloads[str(index)] = payload
+            if self.condo or not payload['condo']:
+                self.lincs.put((index, payload))
+
+
+    def map(self, workers, browsers):
+        """
+        Location stage: LINCs already mapped, cached or resolvable from their ATS
+        reference are placed at once, condo units wait on the first unit of their plan,
+        and the rest are queued for the browsers.
+        """
+        finished = 0
+        while finished < workers:
+            item = self.lincs.get()
+            if item is None:
+                finished += 1
+                continue
+            index, payload = item
+            linc = payload['linc']
+            if linc is None:
+                continue
+            with self.lock:
+                queued = linc in self.waiting
+                self.waiting.setdefault(linc, []).append(payload)
+            if queued or self.place(linc):
+                continue
+
+            plan = payload['short_legal'].split()[0] if payload['condo'] and payload['short_legal'] else None
+            if plan and plan not in self.spatial.split_plans:
+                if plan in self.plans and self.plans[plan] != linc:
+                    self.units[linc] = self.plans[plan]
+                    continue
+                self.plans[plan] = linc
+
+            cached = self.spatial.parcels.lookup([linc]) if self.spatial.parcels else {}
+            if linc in cached:
+                self.emit(linc, (cached[linc].lng, cached[linc].lat))
+                continue
+            if not self.spatial.site_plans:
+                lng, lat = ats.locate([payload['ats_reference']])[0]
+                if not np.isnan(lng):
+                    self.emit(linc, (float(lng), float(lat)), record=True)
+                    continue
+            self.tasks.put(linc)
+
+        for _ in range(browsers):
+            self.tasks.put(None)
+
+
+    def collect(self):
+        """Take mapped parcels from the browsers as they finish"""
+        while True:
+            item = self.results.get()
+            if item is None:
+                return
+            linc, parcel, encoding = item
+            if parcel is not None:
+                self.mapped.append((parcel, encoding))
+                self.emit(linc, (parcel.lng, parcel.lat), record=True)
+
+
+    def place(self, linc):
+        """Emit a LINC that already has a point, returning whether it did"""
+        with self.lock:
+            point = self.sites.get(linc)
+        if point is None:
+            return False
+        self.emit(linc, point)
+        return True
+
+
+    def emit(self, linc, point, record=False):
+        """Give a LINC its point and append a feature for every title waiting on it"""
+        if record and self.spin.progress:
+            self.spin.progress.record_site(linc, point)
+        with self.lock:
+            self.sites[linc] = point
+            payloads = self.waiting.pop(linc, [])
+            if not payloads:
+                return
+            with open(self.output, "a") as f:
+                for payload in payloads:
+                    properties = {k: v for k, v in payload.items() if k != 'title_text'}
+                    feature = dict(type='Feature', properties=properties,
+                                   geometry=dict(type='Point', coordinates=list(point)))
+                    f.write(json.dumps(feature, default=str) + '\n')
+
+
+    def finish(self):
+        """Fan condo plans out to their units and save the journal, dataframe and geodataframe"""
+        self.spatial.settle(self.mapped)
+
+        for unit, linc in self.units.items():
+            if unit not in self.sites and linc in self.sites:
+                self.spatial.share_site_plan(linc, unit)
+                self.emit(unit, self.sites[linc], record=True)
+
+        spin, runtime = self.spin, self.spin.runtime
+        journal = spin.bundle()
+        spin.journal = journal[journal['Registration Date'] >= self.period]
+        write_frame(spin.journal, artifact(runtime, 'journal', spin.format))
+        if spin.store:
+            spin.store.record_titles(spin.journal['Registration Date'], self.payloads)
+        spin.dataframe = assemble(spin.journal.index, self.payloads)
+        write_frame(spin.dataframe, artifact(runtime, 'dataframe', spin.format))
+
+        dataframe = spin.dataframe if self.condo else spin.dataframe[spin.dataframe['condo'] == False]
+        if spin.store:
+            spin.store.record_sites(self.sites)
+        points = [Point(self.sites[int(linc)]) if not pd.isna(linc) and int(linc) in self.sites else Point()
+                  for linc in dataframe['linc']]
+        self.spatial.geodataframe = gpd.GeoDataFrame(dataframe, geometry=gpd.GeoSeries(points, index=dataframe.index),
+                                                     crs='EPSG:4326')
+        write_frame(self.spatial.geodataframe, artifact(runtime, 'geodataframe', self.spatial.format))
+        click.echo('Pipeline finished; journal, dataframe and geodataframe saved with timestamp {}'.format(runtime))
+
+        return self.spatial
+
+
+def write_metrics(runtime, path=None):
+    """
+    Report a run's metrics and save their summary, by default beside its artifacts, with
+    any trace next to the summary
+    """
+    click.echo(metrics.report())
+    path = path or 'run/{}.metrics.json'.format(runtime)
+    stem = os.path.splitext(path)[0]
+    trace = '{}.trace.json'.format(stem[:-len('.metrics')] if stem.endswith('.metrics') else stem)
+    metrics.dump(path, trace)
+    click.echo('Metrics saved to {}{}'.format(path, ' and trace to {}'.format(trace) if metrics.METRICS.tracing else ''))
+
+
 @click.command()
-@click.argument('community', nargs=1)
-@click.option('--date', prompt=True, help='Date to pull from')
+@click.argument('community', nargs=1, required=False)
+@click.option('--date', default=None, help='Date to pull from')
 @click.option('--condo/--no-condo', default=False, help='Pass condos to Spatial')
-@click.option('--journal', default=False, help='Use existing journal pickle')
-@click.option('--dataframe', default=False, help='Use existing dataframe pickle')
-@click.option('--save', default=False, help='Path to save GeoJSON')
+@click.option('--journal', default=False, help='Use an existing journal')
+@click.option('--dataframe', default=False, help='Use an existing dataframe')
+@click.option('--save', default=False, help='File name to save the located titles under')
+@click.option('--format', default='parquet', type=click.Choice(list(FORMATS)),
+              help='Format of run artifacts and saved output')
 @click.option('--force/--no-force', default=False, help='Silence all confirmations')
-def terra(community, date, condo, journal, dataframe, save, force):
+@click.option('--adaptive/--no-adaptive', default=False, help='Subdivide coarse quadrants only where needed')
+@click.option('--density', default=None, type=int, help='Quadrant size in metres')
+@click.option('--split-at', default=500, type=int,
+              help='Titles in one search at which an adaptive quadrant is taken as truncated and divided')
+@click.option('--min-cell', default=100, type=int, help='Smallest adaptive quadrant in metres')
+@click.option('--area', default=None, help='GeoJSON file or WKT polygon to clip the search to')
+@click.option('--workers', default=1, type=int, help='Concurrent requests to Spin')
+@click.option('--rate', default=0.5, type=float,
+              help='Requests per second across all workers and browsers; the budget unless --max-rate is given')
+@click.option('--max-rate', default=None, type=float,
+              help='Budget the request rate may adapt up to, --rate unless given')
+@click.option('--browsers', default=1, type=int, help='Headless browsers mapping LINCs in parallel')
+@click.option('--site-plans/--no-site-plans', default=False,
+              help='Map every LINC in a browser for its site plan rather than locating it from its ATS reference')
+@click.option('--site-format', default='png', type=click.Choice(list(SITE_FORMATS)), help='Site plan image encoding')
+@click.option('--site-quality', default=80, type=int, help='WebP and JPEG site plan quality')
+@click.option('--site-scale', default=1.0, type=float, help='Scale factor applied to site plans')
+@click.option('--split-plan', 'split_plans', multiple=True,
+              help='Condo plan spanning several buildings whose units are mapped separately')
+@click.option('--parcel-cache/--no-parcel-cache', default=True, help='Reuse LINCs mapped in earlier runs')
+@click.option('--parcel-cache-size', default=None, type=int,
+              help='Most LINCs the parcel cache keeps, evicting the least recently used; unbounded unless given')
+@click.option('--cache-dir', default='data/cache', help='Directory for cached Spin responses')
+@click.option('--cache/--no-cache', default=True, help='Reuse cached Spin responses')
+@click.option('--base-url', default=SPIN_URL, help='Root of the Spin application, e.g. a local simulator')
+@click.option('--pipeline/--no-pipeline', default=False,
+              help='Stream titles from search to retrieval to mapping instead of running each stage in turn')
+@click.option('--warehouse/--no-warehouse', default=True, help='Add located titles to the local warehouse')
+@click.option('--resume', default=None, help='Resume an interrupted run by its timestamp')
+@click.option('--since-last-run', is_flag=True, default=False,
+              help='Only pull titles new or changed since the last run, over its period unless --date is given')
+@click.option('--profile', is_flag=True, default=False, help='Record a Chrome trace timeline of the run')
+@click.option('--metrics-out', default=None, help='Path for the JSON summary of timings and counters')
+def terra(community, date, condo, journal, dataframe, save, force, adaptive, density, split_at, min_cell, area,
+          workers, rate, max_rate, cache_dir, cache, base_url, resume, since_last_run, browsers, parcel_cache,
+          parcel_cache_size, site_plans, split_plans, site_format, site_quality, site_scale, pipeline, warehouse,
+          format, profile, metrics_out):
     """
     Entry point for CLI
     """
+    if profile or metrics_out:
+        metrics.enable(trace=profile)
+    cache = ResponseCache(cache_dir) if cache else None
+    # Searches, titles and map searches adapt separately but share the one budget
+    budget = RateLimiter(max_rate or rate)
+    limiter = RateController(rate, ceiling=max_rate, budget=budget)
+    mapping = RateController(rate, ceiling=max_rate, slow=30.0, budget=budget, name='rate.browser')
+    blobs = BlobStore()
+    parcels = ParcelCache(max_entries=parcel_cache_size, blobs=blobs) if parcel_cache else None
+    encoder = SitePlanEncoder(blobs, format=site_format, quality=site_quality, scale=site_scale)
+
+    if resume:
+        if not os.path.exists(Progress.locate(resume)):
+            raise click.BadParameter('No progress store for run {}'.format(resume), param_hint='--resume')
+        progress = Progress(resume)
+        options = progress.config()
+        community, date, condo, save = options['community'], options['date'], options['condo'], options['save']
+        since_last_run = options.get('since_last_run', False)
+        site_plans = options.get('site_plans', site_plans)
+        split_plans = options.get('split_plans', split_plans)
+        pipeline = options.get('pipeline', pipeline)
+        format = options.get('format', 'pickle')
+        adaptive, density, area = options['adaptive'], options['density'], options['area']
+        split_at, min_cell = options.get('split_at', split_at), options.get('min_cell', min_cell)
+
+        # Skip whole stages whose output was already saved
+        if find_artifact(resume, 'dataframe'):
+            dataframe = find_artifact(resume, 'dataframe')
+        elif find_artifact(resume, 'journal'):
+            journal = find_artifact(resume, 'journal')
+        click.echo('Resuming run {} for {}'.format(resume, community))
+    else:
+        if community is None:
+            raise click.UsageError('Missing argument COMMUNITY')
+        if date is None and since_last_run:
+            last = TitleStore(community).last_run()
+            if last is not None and last[1]:
+                date = last[1]
+                click.echo('Pulling titles registered since {}, as the last run on {} did'.format(
+                    date, datetime.fromtimestamp(last[0]).strftime('%Y-%m-%d')))
+        if date is None:
+            date = click.prompt('Date')
+        progress = Progress()
+        progress.configure(dict(community=community, date=date, condo=condo, save=save,
+                                adaptive=adaptive, density=density, split_at=split_at, min_cell=min_cell,
+                                area=area, since_last_run=since_last_run, site_plans=site_plans,
+                                split_plans=list(split_plans), pipeline=pipeline,
+                                format=format))
+
+    if profile or metrics_out:
+        click.get_current_context().call_on_close(lambda: write_metrics(progress.runtime, metrics_out))
+
+    store = TitleStore(community) if since_last_run else None
+    spatial = dict(progress=progress, store=store, browsers=browsers, limiter=mapping, base_url=base_url,
+                   parcels=parcels, site_plans=site_plans, split_plans=split_plans, encoder=encoder, format=format)
+
+    data = None
     if not dataframe:
         if not journal:
-            geo = Geography(community)
+            if density is None:
+                density = 1600 if adaptive else 200
+            geo = Geography(community, density=density, adaptive=adaptive, area=area, gazetteer=Gazetteer(),
+                            limit=split_at, minimum=min_cell)
             if not force: click.confirm('There are {} grids in {}. Continue?'.format(len(geo.geography), geo.bounds.locality), abort=True)
 
             date_object = datetime.strptime(date, '%Y-%m-%d')
             if not force: click.confirm('Journal all transactions beginning {}?'.format(date_object.strftime('%B %d, %Y')), abort=True)
 
-            spin = Spin(geo.geography, date)
+            if pipeline:
+                spin = Spin(workers=workers, cache=cache, progress=progress, store=store, limiter=limiter,
+                            base_url=base_url, blobs=blobs, format=format)
+                data = Pipeline(spin, Spatial([], **spatial), date, condo=condo).run(geo.geography)
+            else:
+                spin = Spin(geo.geography, date, workers=workers, cache=cache, progress=progress,
+                            store=store, limiter=limiter, base_url=base_url, blobs=blobs, format=format)
         else:
-            spin = Spin(pull_period=date, journal=journal)
+            spin = Spin(pull_period=date, journal=journal, workers=workers, cache=cache, progress=progress,
+                        store=store, limiter=limiter, base_url=base_url, blobs=blobs, format=format)
     else:
-        spin = Spin()
-        spin.dataframe = pd.read_pickle(dataframe)
+        spin = Spin(progress=progress, base_url=base_url, blobs=blobs, format=format)
+        spin.dataframe = read_frame(dataframe)
 
+    if cache:
+        click.echo(cache.summary())
+    click.echo(limiter.summary())
 
-    if condo:
+    if data is None and condo:
         if not force: click.confirm('There are {} records to retrieve. Continue?'.format(len(spin.dataframe)), abort=True)
-        data = Spatial(spin.dataframe)
-    else:
+        data = Spatial(spin.dataframe, **spatial)
+    elif data is None:
         if not force: click.confirm('There are {} records to retrieve. Continue?'.format(len(spin.dataframe[spin.dataframe['condo'] == False])), abort=True)
-        data = Spatial(spin.dataframe[spin.dataframe['condo'] == False])
+        data = Spatial(spin.dataframe[spin.dataframe['condo'] == False], **spatial)
 
-    data.geodataframe['registration_date'] = data.geodataframe['registration_date'].astype(str)
-    data.geodataframe['condo'] = data.geodataframe['condo'].astype(int)
+    if store:
+        store.finish(progress.runtime, date)
 
+    if warehouse:
+        local = Warehouse()
+        with metrics.span('warehouse.upsert'):
+            local.upsert(data.geodataframe)
+        local.record_cells(spin.searched, since=date, condos=condo)
+
+    if save:
+        if os.path.splitext(save)[1].lstrip('.') not in FORMATS.values():
+            save = '{}.{}'.format(save, FORMATS[format])
+        write_frame(data.geodataframe, 'data/geojson/{}'.format(save))
+        click.echo('{} saved to data folder'.format(save))
+
+
+@click.command()
+@click.argument('area', nargs=1)
+@click.option('--since', default=None, help='Only titles registered on or after this date')
+@click.option('--max-age', default=None, type=float, help='Days after which searched cells are searched again')
+@click.option('--density', default=400, type=int, help='Quadrant size in metres for stale cells')
+@click.option('--workers', default=1, type=int, help='Concurrent requests to Spin')
+@click.option('--rate', default=0.5, type=float, help='Requests per second across all workers')
+@click.option('--save', default=None, help='Path to save GeoJSON')
+def query(area, since, max_age, density, workers, rate, save):
+    """
+    Titles inside a locality, WKT polygon or GeoJSON file, answered from the local
+    warehouse. With --max-age, cells not searched within that many days are first
+    searched again, and the titles found there are pulled and located.
+    """
+    local = Warehouse()
+    geo = Geography(gazetteer=Gazetteer())
+    try:
+        polygon = geo.shape(area)
+    except (shapely.errors.ShapelyError, ValueError):
+        bounds = geo.bound(area)
+        polygon = geo.area if geo.area is not None else Polygon(
+            [bounds.southwest[::-1], bounds.northwest[::-1], bounds.northeast[::-1], bounds.southeast[::-1]])
+
+    if max_age is not None:
+        if since is None:
+            raise click.UsageError('--since is needed to pull titles for stale cells')
+        projected = PROJECTION.forward_geometry(polygon)
+        x_min, y_min, x_max, y_max = projected.bounds
+        cells = clip(Geography.grid((y_max, x_max), (y_min, x_min), density), projected)
+        stale = local.stale(cells, max_age * 24 * 3600, since)
+        click.echo('{} of {} cells are stale'.format(len(stale), len(cells)))
+        if stale:
+            blobs = BlobStore()
+            spin = Spin(stale, since, workers=workers, rate=rate, blobs=blobs)
+            # Condos are kept so the refreshed cells answer any later query
+            data = Spatial(spin.dataframe, limiter=RateLimiter(rate), encoder=SitePlanEncoder(blobs))
+            local.upsert(data.geodataframe)
+            local.record_cells(spin.searched, since=since, condos=True)
+
+    start = monotonic()
+    found = local.query(polygon, since)
+    click.echo('{} titles in {:.1f} ms'.format(len(found), (monotonic() - start) * 1000))
     if save:
-        data.geodataframe.to_file('data/geojson/{}'.format(save), driver='GeoJSON')
+        write_frame(found, 'data/geojson/{}'.format(save))
         click.echo('{} saved to data folder'.format(save))
+    else:
+        click.echo(found.drop(columns='geometry').to_string(max_rows=20))
+
+
+@click.group()
+@click.option('--path', default='data/parcels.db', help='Parcel cache database')
+@click.option('--parcel-cache-size', default=None, type=int,
+              help='Most LINCs the cache keeps, evicting the least recently used; unbounded unless given')
+@click.pass_context
+def parcels(ctx, path, parcel_cache_size):
+    """
+    Inspect, warm and prune the LINC parcel cache
+    """
+    ctx.obj = ParcelCache(path, max_entries=parcel_cache_size, blobs=BlobStore())
+
+
+@parcels.command()
+@click.pass_obj
+def stats(cache):
+    """Number of cached parcels and their fetch dates"""
+    summary = cache.stats()
+    click.echo('{} parcels cached'.format(summary['count']))
+    if summary['count']:
+        click.echo('Oldest fetched {}'.format(datetime.fromtimestamp(summary['oldest']).isoformat()))
+        click.echo('Newest fetched {}'.format(datetime.fromtimestamp(summary['newest']).isoformat()))
+
+
+@parcels.command()
+@click.argument('lincs', nargs=-1, type=int)
+@click.pass_obj
+def show(cache, lincs):
+    """Print cached entries for some LINCs"""
+    found = cache.lookup(lincs)
+    for linc in lincs:
+        parcel = found.get(linc)
+        click.echo('{}: {}'.format(linc, dict(parcel._asdict()) if parcel else 'not cached'))
+
+
+@parcels.command()
+@click.argument('dataframe', nargs=1)
+@click.option('--browsers', default=1, type=int, help='Headless browsers mapping LINCs in parallel')
+@click.option('--rate', default=0.5, type=float, help='Map searches per second across all browsers')
+@click.pass_obj
+def warm(cache, dataframe, browsers, rate):
+    """Map every uncached LINC in a saved dataframe"""
+    lincs = [int(linc) for linc in read_frame(dataframe, columns=['linc'])['linc'].dropna().unique()]
+    todo = [linc for linc in lincs if linc not in cache.lookup(lincs)]
+    click.echo('{} of {} LINCs already cached'.format(len(lincs) - len(todo), len(lincs)))
+    Spatial([], browsers=browsers, limiter=RateLimiter(rate), parcels=cache,
+            encoder=SitePlanEncoder(cache.blobs)).map_lincs(todo)
+
+
+@parcels.command()
+@click.option('--max-age', default=365, type=int, help='Days after which a parcel is dropped')
+@click.pass_obj
+def prune(cache, max_age):
+    """
+    Drop parcels fetched too long ago so they are remapped on next use, then the least
+    recently used past --parcel-cache-size
+    """
+    click.echo('{} parcels pruned'.format(cache.prune(max_age * 24 * 3600)))
+    if cache.max_entries is not None:
+        count = cache.stats()['count']
+        cache.evict(cache.max_entries)
+        click.echo('{} parcels evicted'.format(count - cache.stats()['count']))
+
+
+@click.group()
+@click.option('--directory', default='data/blobs', help='Blob store directory')
+@click.pass_context
+def blobs(ctx, directory):
+    """
+    Inspect the packed title and site plan store and move blobs in and out of it
+    """
+    ctx.obj = BlobStore(directory)
+
+
+@blobs.command('stats')
+@click.pass_obj
+def blob_stats(store):
+    """Names, distinct blobs and packed sizes of titles and site plans"""
+    for kind, summary in sorted(store.stats().items()):
+        click.echo('{}: {} names, {} blobs, {:.1f} MB as written, {:.1f} MB distinct, {:.1f} MB packed'.format(
+            kind, summary['names'], summary['blobs'], summary['size'] / 1024 ** 2,
+            summary['unique'] / 1024 ** 2, summary['stored'] / 1024 ** 2))
+
+
+@blobs.command('import')
+@click.option('--titles', default='data/titles', help='Folder of title texts to pack')
+@click.option('--sites', default='data/sites', help='Folder of site plans to pack')
+@click.pass_obj
+def import_blobs(store, titles, sites):
+    """Pack title texts and site plans saved one file apiece by earlier versions"""
+    count = 0
+    for kind, directory in (('title', titles), ('site', sites)):
+        if not os.path.isdir(directory):
+            continue
+        for entry in sorted(os.scandir(directory), key=lambda e: e.name):
+            stem, extension = os.path.splitext(entry.name)
+            extension = extension.lstrip('.')
+            if kind == 'title' and extension != 'txt':
+                continue
+            if kind == 'site' and (not stem.isdigit() or extension not in [e for _, e, _ in SITE_FORMATS.values()]):
+                continue
+            with open(entry.path, "rb") as f:
+                data = f.read()
+            name = normalize_title(stem) if kind == 'title' else site_name(stem)
+            store.put(kind, name, data, extension, compress=kind == 'title')
+            count += 1
+    click.echo('{} files packed'.format(count))
+
+
+@blobs.command('export')
+@click.argument('kind', type=click.Choice(['title', 'site']))
+@click.argument('directory', nargs=1)
+@click.pass_obj
+def export_blobs(store, kind, directory):
+    """Write every title text or site plan out as its own file"""
+    os.makedirs(directory, exist_ok=True)
+    names = store.names(kind)
+    for name, extension in names:
+        with open(os.path.join(directory, '{}.{}'.format(name, extension)), "wb") as f:
+            f.write(store.get(kind, name))
+    click.echo('{} files written to {}'.format(len(names), directory))
+
+
+@click.group()
+@click.option('--path', default='data/gazetteer.db', help='Gazetteer database')
+@click.pass_context
+def gazetteer(ctx, path):
+    """
+    Manage the local gazetteer of Alberta localities
+    """
+    ctx.obj = Gazetteer(path)
+
+
+@gazetteer.command('import')
+@click.argument('geojson', nargs=1)
+@click.option('--field', default='name', help='Feature property holding the locality name')
+@click.pass_obj
+def import_boundaries(places, geojson, field):
+    """Load locality boundaries from a GeoJSON file"""
+    click.echo('{} localities imported'.format(places.load(geojson, field)))
+
+
+@gazetteer.command()
+@click.argument('locality', nargs=1)
+@click.pass_obj
+def lookup(places, locality):
+    """Show the entry a locality name resolves to"""
+    found = places.lookup(locality)
+    if found is None:
+        raise click.ClickException('{} is not in the gazetteer'.format(locality))
+    formatted, viewport, polygon = found
+    click.echo('{}: {} to {}{}'.format(formatted, viewport['southwest'], viewport['northeast'],
+                                       ' with boundary' if polygon is not None else ''))
+
+
+@gazetteer.command('list')
+@click.pass_obj
+def list_localities(places):
+    """List every locality in the gazetteer"""
+    for formatted, source, fetched in places.localities():
+        click.echo('{} ({}, {})'.format(formatted, source, datetime.fromtimestamp(fetched).date()))
 
 
 if __name__ == '__main__':
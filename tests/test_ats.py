@@ -0,0 +1,95 @@
+"""
+Control points for locating Alberta Township System references.
+
+Townships are counted north from the 49th parallel and ranges west from each meridian,
+so the south east corner of 1-1-1-W4 sits on the Fourth Meridian at the border, near
+49.00N 110.005W. Sections are numbered from 1 in the south east corner of a township
+in rows of six that alternate direction, ending with 36 in the north east corner;
+legal subdivisions do the same in rows of four within a section, ending with 16.
+Centroids are approximate, so corners are checked within CORNER_TOLERANCE degrees, and
+cells in the same column only within half a cell, since meridians converge northward.
+"""
+import numpy as np
+import pytest
+
+from ats import locate
+
+CORNER_TOLERANCE = 0.01
+# A legal subdivision is a twenty fourth of a township either way
+LSD_FRACTION = 1 / 24
+
+
+def point(reference):
+    lng, lat = locate([reference])[0]
+    return lng, lat
+
+
+def same_column(a, b, cells):
+    """Whether two points in township 4-20-50 fall in the same one of cells columns"""
+    width = point('4 20 50')[0] - point('4 21 50')[0]
+    return abs(a[0] - b[0]) < width / cells / 2
+
+
+def test_south_east_corner_of_the_first_township():
+    lng, lat = point('4 1 1 1 1')
+    width = -(point('4 2 1 1 1')[0] - lng)
+    height = point('4 1 2 1 1')[1] - lat
+    corner = lng + width * LSD_FRACTION / 2, lat - height * LSD_FRACTION / 2
+    assert corner[0] == pytest.approx(-110.005, abs=CORNER_TOLERANCE)
+    assert corner[1] == pytest.approx(49.00, abs=CORNER_TOLERANCE)
+
+
+@pytest.mark.parametrize('below, above', [(1, 12), (6, 7), (12, 13), (30, 31), (25, 36)])
+def test_section_rows_alternate(below, above):
+    south, north = point('4 20 50 {}'.format(below)), point('4 20 50 {}'.format(above))
+    assert same_column(south, north, 6)
+    assert north[1] > south[1]
+
+
+def test_section_corners():
+    township = point('4 20 50')
+    points = {section: point('4 20 50 {}'.format(section)) for section in (1, 6, 31, 36)}
+    assert points[1][0] > township[0] and points[1][1] < township[1]
+    assert points[6][0] < township[0] and points[6][1] < township[1]
+    assert points[31][0] < township[0] and points[31][1] > township[1]
+    assert points[36][0] > township[0] and points[36][1] > township[1]
+    assert same_column(points[36], points[1], 6)
+
+
+def test_legal_subdivision_rows_alternate():
+    points = {lsd: point('4 20 50 10 {}'.format(lsd)) for lsd in range(1, 17)}
+    assert points[1][0] > points[4][0]
+    assert same_column(points[5], points[4], 24)
+    assert same_column(points[8], points[1], 24)
+    assert same_column(points[16], points[1], 24)
+    assert points[16][1] > points[9][1] > points[8][1] > points[1][1]
+
+
+def test_quarters_match_their_legal_subdivisions():
+    for quarter, lsds in {'SE': (1, 2, 7, 8), 'SW': (3, 4, 5, 6), 'NW': (11, 12, 13, 14), 'NE': (9, 10, 15, 16)}.items():
+        centre = np.mean([point('4 20 50 10 {}'.format(lsd)) for lsd in lsds], axis=0)
+        assert point('4 20 50 10 {}'.format(quarter)) == pytest.approx(tuple(centre), abs=1e-6)
+
+
+def test_separators_and_case_are_ignored():
+    assert point('4;20;50;10;se') == point('4 20 50 10 SE')
+
+
+@pytest.mark.parametrize('reference', [
+    None, '', 'CONDOMINIUM', '7 1 1 1 SE', '4 0 1 1', '4 31 1 1', '4 1 0 1', '4 1 127 1',
+    # West of the Fifth Meridian at 60N, which only 4 degrees of ranges reach
+    '4 30 126 36 NW',
+])
+def test_bad_references_are_nan(reference):
+    assert np.isnan(locate([reference])).all()
+
+
+def test_ranges_stop_at_the_next_meridian():
+    lng = point('4 30 1 1 SE')[0]
+    assert -114.0 < lng < -110.0
+    lng = point('5 24 110 1 SE')[0]
+    assert -118.0 < lng < -114.0
+
+
+def test_unknown_section_falls_back_to_the_township():
+    assert point('4 20 50 37') == point('4 20 50')
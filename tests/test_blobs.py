@@ -0,0 +1,59 @@
+"""
+Packed blob store: round trips, deduplication and title dictionaries shared between
+stores open on the same directory.
+"""
+import os
+
+import pytest
+
+from terra import BlobStore
+
+CORPUS = os.path.join(os.path.dirname(__file__), 'titles')
+
+
+def texts():
+    names = sorted(name for name in os.listdir(CORPUS) if name.endswith('.txt'))
+    for name in names:
+        with open(os.path.join(CORPUS, name), "rb") as f:
+            yield os.path.splitext(name)[0], f.read()
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / 'blobs')
+
+
+def test_round_trip_and_deduplication(directory):
+    store = BlobStore(directory, samples=3)
+    digests = {name: store.put('title', name, data, 'txt', compress=True) for name, data in texts()}
+    for name, data in texts():
+        assert store.get('title', name) == data
+    store.put('site', '0000000001', b'plan', 'png')
+    assert store.put('site', '0000000002', b'plan', 'png') == store.entry('site', '0000000001')[0]
+    assert len(set(digests.values())) == len(digests)
+
+
+def test_dictionary_trained_by_another_store_is_loaded_on_read(directory):
+    first, second = BlobStore(directory, samples=3), BlobStore(directory, samples=3)
+    for name, data in texts():
+        second.put('title', name, data, 'txt', compress=True)
+    assert second.dictionaries and not first.dictionaries
+    for name, data in texts():
+        assert first.get('title', name) == data
+
+
+def test_store_sampling_adopts_a_dictionary_trained_meanwhile(directory):
+    first, second = BlobStore(directory, samples=3), BlobStore(directory, samples=3)
+    titles = list(texts())
+    for name, data in titles[:2]:
+        first.put('title', name, data, 'txt', compress=True)
+    for name, data in titles[2:6]:
+        second.put('title', name, data, 'txt', compress=True)
+    for name, data in titles[6:]:
+        first.put('title', name, data, 'txt', compress=True)
+
+    assert len(first.execute('SELECT id FROM dictionaries')) == 1
+    assert first.dictionaries == second.dictionaries
+    for store in (first, second):
+        for name, data in titles:
+            assert store.get('title', name) == data
@@ -0,0 +1,123 @@
+"""
+Finding the manifest a delta bundle is made against, and streaming full and delta
+bundles into a multipart upload to the offline S3 simulator.
+"""
+import io
+import json
+import os
+import zipfile
+from time import time
+
+import boto3
+import click
+import pandas as pd
+import pytest
+from botocore.config import Config
+
+from bundle import BUCKET, MultipartUpload, bundle, manifest
+from simulator import S3Simulator, synthetic_payloads, synthetic_title
+from terra import BlobStore, normalize_title, site_name, write_frame
+
+TITLES = 40
+SITES = 5
+
+
+@pytest.fixture
+def bundles(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    directory = tmp_path / 'data' / 'bundles'
+    directory.mkdir(parents=True)
+    return directory
+
+
+def write(directory, name, record):
+    (directory / name).write_text(json.dumps(record))
+
+
+def test_no_since():
+    assert manifest(None) is None
+
+
+def test_last_without_bundles(bundles):
+    assert manifest('last') is None
+
+
+def test_last_is_the_newest_manifest(bundles):
+    write(bundles, '1700000000.5.json', dict(timestamp=1700000000.5))
+    write(bundles, '1700000100.25.json', dict(timestamp=1700000100.25))
+    assert manifest('last')['timestamp'] == 1700000100.25
+
+
+def test_last_skips_metrics_and_traces(bundles):
+    write(bundles, '1700000000.5.json', dict(timestamp=1700000000.5))
+    write(bundles, '1700000100.25.metrics.json', dict(counters={}))
+    write(bundles, '1700000100.25.trace.json', dict(traceEvents=[]))
+    assert manifest('last')['timestamp'] == 1700000000.5
+
+
+def test_named_manifest(bundles):
+    write(bundles, '1700000000.5.json', dict(timestamp=1700000000.5))
+    assert manifest('1700000000.5')['timestamp'] == 1700000000.5
+
+
+def test_missing_manifest(bundles):
+    with pytest.raises(click.BadParameter):
+        manifest('1700000000.5')
+
+
+@pytest.fixture
+def s3():
+    with S3Simulator(min_part_size=64 * 1024) as simulator:
+        yield simulator
+
+
+@pytest.fixture
+def locality(tmp_path, monkeypatch):
+    """A saved locality with a title text for each title and site plans for a few"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data/geojson')
+    index, payloads = synthetic_payloads(TITLES)
+    store = BlobStore()
+    for title, payload in payloads.items():
+        store.put('title', normalize_title(title), synthetic_title(payload).encode('utf-8'), 'txt', compress=True)
+    lincs = [payload['linc'] for payload in payloads.values()]
+    for linc in lincs[:SITES]:
+        store.put('site', site_name(linc), os.urandom(32 * 1024), 'png')
+    write_frame(pd.DataFrame({'title_number': list(payloads), 'linc': lincs}), 'data/geojson/synthetic.parquet')
+    return store, payloads
+
+
+def upload(s3, store, key, previous=None):
+    client = boto3.client('s3', region_name='ca-central-1', endpoint_url=s3.url,
+                          aws_access_key_id='simulator', aws_secret_access_key='simulator',
+                          config=Config(s3={'addressing_style': 'path'}))
+    sink = MultipartUpload(client, BUCKET, key, part_size=64 * 1024, workers=2)
+    record = bundle(store, ['synthetic.parquet'], sink, time(), previous=previous, workers=2)
+    sink.close()
+    return record, zipfile.ZipFile(io.BytesIO(s3.get(BUCKET, key)))
+
+
+def test_bundle_streams_a_valid_zip_to_s3(s3, locality):
+    store, payloads = locality
+    record, archive = upload(s3, store, 'full.zip')
+    titles = {'data/titles/{}.txt'.format(normalize_title(title)) for title in payloads}
+    assert archive.testzip() is None
+    assert titles <= set(archive.namelist())
+    assert len([name for name in archive.namelist() if name.startswith('data/sites/')]) == SITES
+    assert set(archive.namelist()) == set(record['members']) | {'manifest.json'}
+    assert sum(s3.parts.values()) > 1
+    assert json.loads(archive.read('manifest.json'))['members'] == record['members']
+
+
+def test_delta_holds_only_changed_members(s3, locality):
+    store, payloads = locality
+    previous, _ = upload(s3, store, 'full.zip')
+    title = normalize_title(next(iter(payloads)))
+    store.put('title', title, b'Amended title', 'txt', compress=True)
+
+    record, archive = upload(s3, store, 'delta.zip', previous=previous)
+    assert archive.testzip() is None
+    assert sorted(archive.namelist()) == ['data/titles/{}.txt'.format(title), 'manifest.json']
+    assert archive.read('data/titles/{}.txt'.format(title)) == b'Amended title'
+    assert record['since'] == previous['timestamp']
+    assert set(record['members']) == set(previous['members'])
@@ -0,0 +1,29 @@
+"""
+Writing run artifacts and output in each format.
+"""
+import geopandas as gpd
+import pyogrio
+from shapely.geometry import Point
+
+from terra import read_frame, write_frame
+
+
+def geodataframe():
+    return gpd.GeoDataFrame({'title_number': ['162 255 367', '191 004 882', '201 118 034']},
+                            geometry=[Point(-113.49, 53.54), Point(), Point(-114.07, 51.05)], crs='EPSG:4326')
+
+
+def test_flatgeobuf_holds_located_rows_with_a_spatial_index(tmp_path, capsys):
+    path = str(tmp_path / 'located.fgb')
+    write_frame(geodataframe(), path)
+    assert list(read_frame(path)['title_number']) == ['162 255 367', '201 118 034']
+    assert pyogrio.read_info(path)['capabilities']['fast_spatial_filter']
+    assert '1 of 3 rows have no location' in capsys.readouterr().out
+
+
+def test_parquet_keeps_unlocated_rows(tmp_path):
+    path = str(tmp_path / 'all.parquet')
+    write_frame(geodataframe(), path)
+    frame = read_frame(path)
+    assert len(frame) == 3
+    assert frame.geometry.is_empty.sum() == 1
@@ -0,0 +1,89 @@
+"""
+Control points for the GPS (EPSG:4326) to Alberta 10-TM (EPSG:3401) transform.
+
+Alberta 10-TM is a transverse Mercator on NAD83 (GRS80) with its natural origin at
+0N 115W, scale 0.9992 and no false easting or northing. Points on the central
+meridian therefore have an easting of exactly zero and a northing of 0.9992 times
+the GRS80 meridian arc, computed here independently of pyproj.
+"""
+from math import radians, sin
+
+import numpy as np
+import pytest
+
+from terra import PROJECTION, Geography
+
+A = 6378137.0
+F = 1 / 298.257222101
+SCALE = 0.9992
+CENTRAL_MERIDIAN = -115.0
+
+# Metres; the meridian arc series below is good to well under a millimetre in Alberta
+TOLERANCE = 0.01
+# Degrees; about a millimetre on the ground
+ROUND_TRIP_TOLERANCE = 1e-8
+
+
+def meridian_arc(lat):
+    """Distance along the GRS80 meridian from the equator, by Helmert's series in n"""
+    n = F / (2 - F)
+    phi = radians(lat)
+    return A / (1 + n) * (
+        (1 + n ** 2 / 4 + n ** 4 / 64) * phi
+        - 3 / 2 * (n - n ** 3 / 8) * sin(2 * phi)
+        + 15 / 16 * (n ** 2 - n ** 4 / 4) * sin(4 * phi)
+        - 35 / 48 * n ** 3 * sin(6 * phi)
+        + 315 / 512 * n ** 4 * sin(8 * phi)
+    )
+
+
+# Alberta's southern border, Edmonton's and Fort McMurray's latitudes, and its northern border
+MERIDIAN_POINTS = [(lat, CENTRAL_MERIDIAN, SCALE * meridian_arc(lat), 0.0) for lat in (49.0, 53.5444, 56.7267, 60.0)]
+
+# Places across the province, off the central meridian
+PLACES = [
+    (53.5461, -113.4938),   # Edmonton
+    (51.0447, -114.0719),   # Calgary
+    (49.6935, -112.8418),   # Lethbridge
+    (55.1707, -118.7947),   # Grande Prairie
+    (56.7267, -111.3790),   # Fort McMurray
+    (59.9990, -110.0050),   # north east corner
+]
+
+
+@pytest.mark.parametrize('lat, lng, northing, easting', MERIDIAN_POINTS)
+def test_central_meridian_control_points(lat, lng, northing, easting):
+    assert Geography().nad83((lat, lng)) == pytest.approx((northing, easting), abs=TOLERANCE)
+    assert tuple(PROJECTION.forward_points([(lat, lng)])[0]) == pytest.approx((northing, easting), abs=TOLERANCE)
+
+
+@pytest.mark.parametrize('lat, lng, northing, easting', MERIDIAN_POINTS)
+def test_central_meridian_inverse(lat, lng, northing, easting):
+    assert Geography().nad83((easting, northing), reverse=True) == pytest.approx((lat, lng), abs=ROUND_TRIP_TOLERANCE)
+
+
+def test_natural_origin():
+    assert Geography().nad83((0.0, CENTRAL_MERIDIAN)) == pytest.approx((0.0, 0.0), abs=TOLERANCE)
+
+
+@pytest.mark.parametrize('lat, lng', PLACES)
+def test_symmetric_about_central_meridian(lat, lng):
+    northing, easting = Geography().nad83((lat, lng))
+    mirrored = Geography().nad83((lat, 2 * CENTRAL_MERIDIAN - lng))
+    assert mirrored == pytest.approx((northing, -easting), abs=TOLERANCE)
+
+
+@pytest.mark.parametrize('lat, lng', PLACES)
+def test_round_trip(lat, lng):
+    geography = Geography()
+    northing, easting = geography.nad83((lat, lng))
+    assert geography.nad83((easting, northing), reverse=True) == pytest.approx((lat, lng), abs=ROUND_TRIP_TOLERANCE)
+
+
+def test_vectorized_matches_scalar():
+    points = np.array(PLACES)
+    projected = PROJECTION.forward_points(points)
+    for (lat, lng), (northing, easting) in zip(PLACES, projected):
+        assert Geography().nad83((lat, lng)) == pytest.approx((northing, easting), abs=1e-6)
+    lat, lng = PROJECTION.inverse(projected[:, 0], projected[:, 1])
+    assert np.allclose(np.column_stack([lat, lng]), points, atol=ROUND_TRIP_TOLERANCE)
@@ -0,0 +1,67 @@
+"""
+Pacing of requests to Spin: the adaptive controller's bounds and the shared budget.
+"""
+from threading import Thread
+from time import monotonic
+
+import metrics
+from terra import RateController, RateLimiter
+
+
+def test_ceiling_defaults_to_the_budget():
+    controller = RateController(2.0)
+    assert controller.ceiling == 2.0
+    assert controller.rate == 1.0
+
+
+def test_starts_at_rate_below_a_higher_ceiling():
+    controller = RateController(1.0, ceiling=4.0)
+    assert controller.rate == 1.0
+
+
+def test_rises_to_the_ceiling_and_no_further():
+    controller = RateController(2.0)
+    for _ in range(1000):
+        controller.feedback(True, 0.1)
+    assert controller.rate == controller.ceiling == 2.0
+
+
+def test_backs_off_on_failure_and_slow_responses():
+    controller = RateController(2.0, slow=5.0)
+    controller.feedback(False)
+    controller.feedback(True, 6.0)
+    assert controller.rate == 0.25
+    assert controller.backoffs == 2
+
+
+def test_controllers_share_one_budget():
+    budget = RateLimiter(40)
+    controllers = [RateController(40, budget=budget), RateController(40, budget=budget, name='rate.browser')]
+    for controller in controllers:
+        for _ in range(1000):
+            controller.feedback(True, 0.01)
+    sent = []
+
+    def send(controller):
+        end = monotonic() + 1
+        while monotonic() < end:
+            controller.acquire()
+            sent.append(controller)
+
+    threads = [Thread(target=send, args=(controller,)) for controller in controllers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(sent) <= 40 + 2
+
+
+def test_rate_is_a_gauge():
+    metrics.enable()
+    try:
+        controller = RateController(2.0)
+        controller.feedback(False)
+        gauge = metrics.METRICS.summary()['gauges']['rate.http']
+        assert gauge == dict(value=0.5, min=0.5, max=1.0)
+    finally:
+        metrics.METRICS.enabled = False
@@ -0,0 +1,122 @@
+"""
+Search planning: dividing quadrants, clipping them to an area, and walking an adaptive
+plan against the offline Spin simulator.
+"""
+import pytest
+from shapely.geometry import Polygon, box
+
+from simulator import Registry, Simulator
+from terra import BlobStore, Geography, Quadtree, RateLimiter, ResponseCache, Spin, clip
+
+BOUNDS = (0, 5900000, 4000, 5904000)
+
+
+def square(x, y, size):
+    return [(x, y), (x, y + size), (x + size, y + size), (x + size, y), (x, y)]
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def spin(simulator, workspace, attempts=3):
+    return Spin(base_url=simulator.url, limiter=RateLimiter(1000), blobs=BlobStore(str(workspace / 'blobs')),
+                attempts=attempts, backoff=0)
+
+
+def journaled(registry):
+    """Titles a search of the whole registry should journal: current, non-mineral titles"""
+    return {title for title, kind, rights, date in registry.rows if kind == 'Current Title' and rights != 'Mineral'}
+
+
+def test_divide_into_quadrants():
+    tree = Quadtree([], minimum=100)
+    children = tree.divide(square(0, 0, 400))
+    assert children == [square(0, 0, 200), square(0, 200, 200), square(200, 0, 200), square(200, 200, 200)]
+    assert list(tree.cells) == children
+    assert tree.divided == 1
+
+
+def test_divide_stops_at_the_minimum():
+    tree = Quadtree([], minimum=100)
+    assert tree.divide(square(0, 0, 150)) == []
+    assert len(tree) == 0
+
+
+def test_divide_clips_to_the_area():
+    tree = Quadtree([], minimum=100, area=box(0, 0, 400, 300))
+    children = tree.divide(square(0, 0, 400))
+    assert sum(Polygon(child).area for child in children) == 400 * 300
+
+
+def test_truncated_only_at_the_limit():
+    tree = Quadtree([], limit=3)
+    assert not tree.truncated(None)
+    assert not tree.truncated([1, 2])
+    assert tree.truncated([1, 2, 3])
+
+
+def test_clip_keeps_inside_cuts_boundary_and_drops_outside():
+    cells = [square(0, 0, 100), square(100, 0, 100), square(300, 0, 100)]
+    clipped = clip(cells, box(0, 0, 150, 100))
+    assert clipped[0] == cells[0]
+    assert len(clipped) == 2
+    assert Polygon(clipped[1]).area == pytest.approx(50 * 100)
+
+
+def test_walk_divides_truncated_cells_until_every_title_is_found(workspace):
+    registry = Registry(400, BOUNDS)
+    with Simulator(registry, limit=40) as simulator:
+        search = spin(simulator, workspace)
+        tree = Quadtree(Geography.grid((BOUNDS[3], BOUNDS[2]), (BOUNDS[1], BOUNDS[0]), 2000), limit=40)
+        search.fetch(tree)
+    assert set(search.builder.frame().index) == journaled(registry)
+    assert tree.divided > 0
+    assert search.failed == [] and search.incomplete == []
+
+
+def test_walk_searches_an_empty_cell_once(workspace):
+    registry = Registry(20, (0, 5900000, 1000, 5901000))
+    with Simulator(registry) as simulator:
+        search = spin(simulator, workspace)
+        tree = Quadtree(Geography.grid((BOUNDS[3], BOUNDS[2]), (BOUNDS[1], BOUNDS[0]), 1000))
+        search.fetch(tree)
+        requests = simulator.requests['searchtitleprint.aspx']
+    assert requests == 16
+    assert tree.divided == 0
+    assert set(search.builder.frame().index) == journaled(registry)
+
+
+def test_walk_retries_failed_searches_on_the_same_cell(workspace):
+    registry = Registry(200, BOUNDS)
+    with Simulator(registry, error_rate=0.3, seed=1) as simulator:
+        search = spin(simulator, workspace, attempts=8)
+        tree = Quadtree(Geography.grid((BOUNDS[3], BOUNDS[2]), (BOUNDS[1], BOUNDS[0]), 2000))
+        search.fetch(tree)
+    assert set(search.builder.frame().index) == journaled(registry)
+    assert tree.divided == 0
+    assert search.failed == []
+
+
+def test_walk_reports_cells_that_keep_failing(workspace):
+    with Simulator(Registry(50, BOUNDS), error_rate=1.0) as simulator:
+        search = spin(simulator, workspace, attempts=2)
+        cells = Geography.grid((BOUNDS[3], BOUNDS[2]), (BOUNDS[1], BOUNDS[0]), 2000)
+        tree = Quadtree(cells)
+        search.fetch(tree)
+    assert sorted(search.failed) == sorted(cells)
+    assert tree.divided == 0
+    assert search.searched == []
+
+
+def test_empty_search_is_cached(workspace):
+    with Simulator(Registry(50, bounds=BOUNDS)) as simulator:
+        client = Spin(base_url=simulator.url, limiter=RateLimiter(1000), blobs=BlobStore(str(workspace / 'blobs')),
+                      cache=ResponseCache(str(workspace / 'cache')), backoff=0)
+        empty = square(10000, 5900000, 100)
+        assert client.search(empty).empty
+        assert client.search(empty).empty
+        assert simulator.requests['searchtitleprint.aspx'] == 1
+        assert client.cache.hits == 1
@@ -0,0 +1,52 @@
+"""
+Guest sessions against the offline Spin simulator: logging in again when a session
+expires partway through a run, and refusing a login Spin does not confirm.
+"""
+import pytest
+
+import simulator
+from simulator import Registry, Simulator
+from terra import BlobStore, LoginError, RateLimiter, SessionPool, Spin
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def spin(server, workspace):
+    return Spin(base_url=server.url, limiter=RateLimiter(1000), blobs=BlobStore(str(workspace / 'blobs')), backoff=0)
+
+
+def test_expired_session_logs_in_again(workspace):
+    registry = Registry(10)
+    titles = list(registry.payloads)
+    with Simulator(registry) as server:
+        client = spin(server, workspace)
+        assert client.retrieve_title(titles[0])['linc'] == registry.payloads[titles[0]]['linc']
+        assert client.sessions.logins == 1
+
+        server.expire()
+        assert client.retrieve_title(titles[1])['linc'] == registry.payloads[titles[1]]['linc']
+        assert client.sessions.logins == 2
+        assert client.retrieve_title(titles[2]) is not None
+        assert client.sessions.logins == 2
+
+
+def test_saved_session_is_reused_by_a_later_run(workspace):
+    registry = Registry(10)
+    with Simulator(registry) as server:
+        spin(server, workspace).retrieve_title(next(iter(registry.payloads)))
+        later = spin(server, workspace)
+        assert later.retrieve_title(next(iter(registry.payloads))) is not None
+        assert later.sessions.logins == 0
+
+
+def test_unconfirmed_guest_login_raises(workspace, monkeypatch):
+    monkeypatch.setattr(simulator, 'GUEST_PAGE', '<html><body><span>Logon failed.</span></body></html>')
+    with Simulator(Registry(10)) as server:
+        pool = SessionPool(server.url, limiter=RateLimiter(1000))
+        with pytest.raises(LoginError):
+            pool.login()
+        assert pool.logins == 0
@@ -0,0 +1,44 @@
+"""
+Settling mapped parcels once their site plans have been encoded.
+"""
+from concurrent.futures import Future
+from time import time
+
+import pytest
+
+from terra import BlobStore, Parcel, ParcelCache, SitePlanEncoder, Spatial
+
+
+@pytest.fixture
+def spatial(tmp_path):
+    blobs = BlobStore(str(tmp_path / 'blobs'))
+    return Spatial([], parcels=ParcelCache(str(tmp_path / 'parcels.db'), blobs=blobs),
+                   encoder=SitePlanEncoder(blobs, workers=1))
+
+
+def parcel(linc):
+    return Parcel(linc, 1.0, 2.0, -113.5, 53.5, '{:010d}'.format(linc), None, time())
+
+
+def encoded(digest=None, error=None):
+    future = Future()
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(digest)
+    return future
+
+
+def test_settle_records_digests(spatial):
+    settled = spatial.settle([(parcel(1), encoded('a' * 64)), (parcel(2), None)])
+    assert [p.digest for p in settled] == ['a' * 64, None]
+    assert spatial.parcels.stats()['count'] == 2
+
+
+def test_settle_keeps_parcels_whose_site_plan_failed(spatial, capsys):
+    digest = spatial.encoder.blobs.put('site', '0000000002', b'site plan', 'png')
+    settled = spatial.settle([(parcel(1), encoded(error=OSError('truncated image'))), (parcel(2), encoded(digest))])
+    assert [(p.linc, p.digest) for p in settled] == [(1, None), (2, digest)]
+    assert 'LINC 1 failed to encode' in capsys.readouterr().err
+    # Without its site plan the failed parcel is left for the browser next time
+    assert list(spatial.parcels.lookup([1, 2])) == [2]
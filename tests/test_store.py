@@ -0,0 +1,40 @@
+"""
+Per-locality title store behind --since-last-run.
+"""
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from terra import TitleStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'titles.db')
+
+
+def test_last_run_keeps_its_period(path):
+    store = TitleStore('Edmonton', path)
+    assert store.last_run() is None
+    store.finish(1700000000.0, '2020-01-01')
+    assert TitleStore(' edmonton ', path).last_run() == (1700000000.0, '2020-01-01')
+    assert TitleStore('Calgary', path).last_run() is None
+
+
+def test_runs_from_before_periods_were_kept_have_none(path):
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE runs (locality TEXT PRIMARY KEY, runtime REAL)')
+    db.execute("INSERT INTO runs VALUES ('edmonton', 1600000000.0)")
+    db.commit()
+    db.close()
+    assert TitleStore('Edmonton', path).last_run() == (1600000000.0, None)
+
+
+def test_only_unchanged_titles_are_reused(path):
+    store = TitleStore('Edmonton', path)
+    registered = pd.Series(['2020-05-01', '2021-02-03'], index=['162 255 367', '191 004 882'])
+    store.record_titles(registered, {'162 255 367': dict(linc=1, title_text='a'),
+                                     '191 004 882': dict(linc=2, title_text='b')})
+    again = pd.Series(['2020-05-01', '2022-07-08', '2019-01-01'], index=['162 255 367', '191 004 882', '201 118 034'])
+    assert store.payloads(again) == {'162 255 367': dict(linc=1)}
@@ -0,0 +1,62 @@
+"""
+Regression checks of the title parser against the checked-in corpus in tests/titles.
+
+The corpus covers the layouts the original regex parser handled: saved texts and raw
+<pre> elements, condominium units with several reference numbers, missing ATS
+references and reference numbers, suffixed title numbers, nominal considerations,
+Windows line endings, and a page that is not a title at all. golden.json holds their
+records, produced by `terra-titles golden` and checked against the original parser.
+"""
+import json
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from titles import main, parse, parse_directory, record
+
+CORPUS = os.path.join(os.path.dirname(__file__), 'titles')
+GOLDEN = os.path.join(CORPUS, 'golden.json')
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_verify_corpus(workers):
+    result = CliRunner().invoke(main, ['verify', GOLDEN, '--directory', CORPUS, '--workers', str(workers)])
+    assert result.exit_code == 0, result.output
+    assert '9 of 9 titles match' in result.output
+
+
+def test_verify_reports_differences(tmp_path):
+    with open(GOLDEN, "r") as f:
+        expected = json.load(f)
+    expected['transfer.txt']['value'] = 1
+    changed = tmp_path / 'golden.json'
+    changed.write_text(json.dumps(expected))
+
+    result = CliRunner().invoke(main, ['verify', str(changed), '--directory', CORPUS, '--workers', '1'])
+    assert result.exit_code == 1
+    assert 'transfer.txt: expected' in result.output
+    assert '8 of 9 titles match' in result.output
+
+
+def test_golden_reproduces_corpus(tmp_path):
+    output = tmp_path / 'golden.json'
+    result = CliRunner().invoke(main, ['golden', str(output), '--directory', CORPUS, '--workers', '1'])
+    assert result.exit_code == 0, result.output
+    with open(GOLDEN, "r") as f:
+        assert json.loads(output.read_text()) == json.load(f)
+
+
+def test_malformed_title_is_none():
+    assert parse_directory(CORPUS, workers=1)['malformed.txt'] is None
+    with open(os.path.join(CORPUS, 'malformed.txt'), "r") as f:
+        with pytest.raises(ValueError):
+            parse(f.read())
+
+
+def test_raw_and_saved_text_agree():
+    with open(os.path.join(CORPUS, 'raw_pre.txt'), "r") as f:
+        raw = f.read()
+    saved = raw.strip()[len('<pre>'):-len('</pre>')]
+    assert record(parse(raw)) == record(parse(saved))
+    assert parse(raw).title_text == saved.strip()
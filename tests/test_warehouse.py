@@ -0,0 +1,56 @@
+"""
+Which warehouse cells can answer a query without searching Spin again.
+"""
+import sqlite3
+
+import pytest
+
+from terra import Warehouse
+
+DAY = 24 * 3600
+CELL = [(0, 0), (0, 100), (100, 100), (100, 0), (0, 0)]
+
+
+@pytest.fixture
+def warehouse(tmp_path):
+    return Warehouse(str(tmp_path / 'warehouse.db'))
+
+
+def test_unsearched_cell_is_stale(warehouse):
+    assert warehouse.stale([CELL], DAY, '2020-01-01') == [CELL]
+
+
+def test_cell_searched_from_an_earlier_cutoff_is_fresh(warehouse):
+    warehouse.record_cells([CELL], since='2019-01-01', condos=True)
+    assert warehouse.stale([CELL], DAY, '2020-01-01') == []
+    assert warehouse.stale([CELL], DAY, '2019-01-01') == []
+
+
+def test_cell_searched_from_a_later_cutoff_is_stale(warehouse):
+    warehouse.record_cells([CELL], since='2021-06-30', condos=True)
+    assert warehouse.stale([CELL], DAY, '2020-01-01') == [CELL]
+    assert warehouse.stale([CELL], DAY, None) == [CELL]
+
+
+def test_cell_searched_without_condos_is_stale(warehouse):
+    warehouse.record_cells([CELL], since='2019-01-01', condos=False)
+    assert warehouse.stale([CELL], DAY, '2020-01-01') == [CELL]
+
+
+def test_cell_searched_too_long_ago_is_stale(warehouse):
+    warehouse.record_cells([CELL], since='2019-01-01', searched=1.0)
+    assert warehouse.stale([CELL], DAY, '2020-01-01') == [CELL]
+
+
+def test_cells_recorded_before_cutoffs_were_kept_are_stale(tmp_path):
+    path = str(tmp_path / 'warehouse.db')
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE cells (id INTEGER PRIMARY KEY, polygon TEXT UNIQUE, searched REAL)')
+    db.commit()
+    db.close()
+
+    warehouse = Warehouse(path)
+    warehouse.record_cells([CELL], since='2019-01-01')
+    assert warehouse.stale([CELL], DAY, '2020-01-01') == []
+    warehouse.db.execute('UPDATE cells SET since = NULL, condos = NULL')
+    assert warehouse.stale([CELL], DAY, '2020-01-01') == [CELL]
@@ -0,0 +1,193 @@
+import os
+import re
+import json
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import click
+
+
+Title = namedtuple('Title', [
+    'linc',
+    'short_legal',
+    'title_number',
+    'ats_reference',
+    'municipality',
+    'reference_number',
+    'registration',
+    'date',
+    'document_type',
+    'value',
+    'consideration',
+    'condo',
+    'title_text'
+])
+
+IDENTITY = re.compile(r"(\d{4} \d{3} \d{3})\s{2,}(\S+)\s{2,}(\d{3} \d{3} \d{3} *\S*)")
+NON_DIGITS = re.compile(r"[^0-9]+")
+DASHES = '-' * 80
+
+
+def strip_tags(text):
+    """Remove a surrounding <pre> element, leaving the characters inside it alone"""
+    text = text.strip()
+    if text.startswith('<pre'):
+        text = text[text.index('>') + 1:]
+    if text.endswith('</pre>'):
+        text = text[:-len('</pre>')]
+    return text.strip()
+
+
+def to_int(string):
+    """Try to convert a string to integer; return None if non-numeric"""
+    value = NON_DIGITS.sub('', string)
+    return int(value) if value else None
+
+
+def field(text, marker, start=0):
+    """Rest of the line following a marker, or None if the marker is absent"""
+    position = text.find(marker, start)
+    if position < 0:
+        return None
+    position += len(marker)
+    end = text.find('\n', position)
+    return text[position:end if end >= 0 else len(text)]
+
+
+def parse(text):
+    """
+    Parses a title and returns a Title record. Every field is located with a forward
+    scan from a literal marker rather than backtracking patterns, and the registration
+    block is found from the last rule. Accepts either the raw <pre> element from Spin or
+    the saved title text.
+    """
+    text = strip_tags(text)
+
+    identity = IDENTITY.search(text)
+    if identity is None:
+        raise ValueError('Title has no LINC, short legal and title number block')
+
+    ats_reference = field(text, 'ATS REFERENCE: ')
+    if ats_reference and ats_reference[:1].strip():
+        ats_reference = ats_reference.split()[0].replace(';', ' ')
+    else:
+        ats_reference = ''
+
+    municipality = field(text, 'MUNICIPALITY: ')
+    municipality = municipality.replace('\r', '') if municipality is not None else ''
+
+    # Reference numbers run from their marker to the next rule
+    references = ['']
+    position = text.find('REFERENCE NUMBER: ')
+    if position >= 0:
+        end = text.find(DASHES, position)
+        if end >= 0:
+            block = text[position + len('REFERENCE NUMBER: '):end].split('\n')
+            references = [reference.strip() for reference in block if reference.strip()]
+
+    # Registration fields are fixed width on the first line after the last rule
+    first, last = text.find(DASHES), text.rfind(DASHES)
+    if first < 0 or last - first < len(DASHES):
+        raise ValueError('Title has no registration block')
+    registration = text[last + len(DASHES):].lstrip()
+    end = registration.find('\n')
+    if end >= 0:
+        registration = registration[:end]
+
+    return Title(
+        linc=int(identity.group(1).replace(' ', '')),
+        short_legal=identity.group(2).strip().replace(';', ' '),
+        title_number=identity.group(3).strip(),
+        ats_reference=ats_reference,
+        municipality=municipality,
+        reference_number=references,
+        registration=registration[:11],
+        date='-'.join(reversed(registration[15:25].split('/'))),
+        document_type=registration[27:46].strip(),
+        value=to_int(registration[46:62]),
+        consideration=to_int(registration[62:80]),
+        condo='CONDOMINIUM' in text,
+        title_text=text
+    )
+
+
+def parse_safely(text):
+    """Parse a title, returning None rather than raising on a malformed one"""
+    try:
+        return parse(text)
+    except ValueError:
+        return None
+
+
+def parse_many(texts, workers=None, chunksize=64):
+    """
+    Parses an iterable of title texts across a process pool, preserving order. Titles
+    that cannot be parsed come back as None.
+    """
+    if workers == 1:
+        return [parse_safely(text) for text in texts]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(parse_safely, texts, chunksize=chunksize))
+
+
+def parse_directory(directory='data/titles', workers=None):
+    """Parses every .txt title in a directory, returning records keyed by filename"""
+    names = sorted(name for name in os.listdir(directory) if name.endswith('.txt'))
+
+    def read(name):
+        with open(os.path.join(directory, name), "r") as f:
+            return f.read()
+
+    return dict(zip(names, parse_many((read(name) for name in names), workers)))
+
+
+def record(title):
+    """JSON-ready form of a Title, without the full text"""
+    if title is None:
+        return None
+    return {k: v for k, v in title._asdict().items() if k != 'title_text'}
+
+
+@click.group()
+def main():
+    """
+    Batch parsing and regression checks for saved title texts
+    """
+    pass
+
+
+@main.command()
+@click.argument('output', nargs=1)
+@click.option('--directory', default='data/titles', help='Folder of saved title texts')
+@click.option('--workers', default=None, type=int, help='Parser processes')
+def golden(output, directory, workers):
+    """Write the parsed records of every title in a folder as golden output"""
+    records = {name: record(title) for name, title in parse_directory(directory, workers).items()}
+    with open(output, "w") as f:
+        json.dump(records, f, indent=1, sort_keys=True)
+    click.echo('{} titles written to {}'.format(len(records), output))
+
+
+@main.command()
+@click.argument('golden', nargs=1)
+@click.option('--directory', default='data/titles', help='Folder of saved title texts')
+@click.option('--workers', default=None, type=int, help='Parser processes')
+def verify(golden, directory, workers):
+    """Reparse a folder of titles and report any record that differs from golden output"""
+    with open(golden, "r") as f:
+        expected = json.load(f)
+
+    parsed = parse_directory(directory, workers)
+    failures = 0
+    for name in sorted(expected):
+        actual = record(parsed.get(name))
+        if actual != expected[name]:
+            failures += 1
+            click.echo('{}: expected {} got {}'.format(name, expected[name], actual))
+
+    click.echo('{} of {} titles match'.format(len(expected) - failures, len(expected)))
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    pass